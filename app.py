@@ -2,17 +2,17 @@ import hashlib
 import json
 import os
 import secrets
-import subprocess
 import sys
 import tempfile
 import threading
-import time
 from datetime import datetime, timedelta
+from itertools import islice
 
 import spotipy
 from dotenv import load_dotenv
 from flask import (
     Flask,
+    Response,
     jsonify,
     redirect,
     render_template,
@@ -24,6 +24,8 @@ from flask import (
 from flask_socketio import SocketIO, emit
 from spotipy.oauth2 import SpotifyOAuth
 
+from jobs import JobRegistry, QueueFull
+
 # Add scripts directory to path to import existing scripts
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
 
@@ -62,6 +64,17 @@ app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(hours=2)  # 2-hour session
 
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# Background jobs; their events go only to the SocketIO rooms of their followers.
+# Each pool bounds how many jobs load one resource at a time: MusicBrainz gets a
+# single lane, since its rate limit is shared by the whole process anyway
+jobs = JobRegistry(socketio, max_queued=int(os.getenv("MAX_QUEUED_JOBS", 20)))
+jobs.add_pool(
+    "spotify", os.getenv("SPOTIFY_WORKERS", 2), ["fetch_playlist", "fetch_liked"]
+)
+jobs.add_pool("navidrome", os.getenv("NAVIDROME_WORKERS", 2), ["generate_m3u"])
+jobs.add_pool("musicbrainz", 1, ["mb_scan"])
+jobs.add_pool("lidarr", os.getenv("LIDARR_WORKERS", 1), ["send_to_lidarr"])
+
 # Spotify OAuth configuration
 SPOTIFY_CLIENT_ID = os.getenv("CLIENT_ID")
 SPOTIFY_CLIENT_SECRET = os.getenv("CLIENT_SECRET")
@@ -78,10 +91,17 @@ DATA_DIR = os.getenv("DATA_DIR", "data")
 # Settings file for runtime configuration
 SETTINGS_FILE = os.path.join(DATA_DIR, "settings.json")
 
+# Most tracks /api/tracks returns in one page
+MAX_TRACK_PAGE = 500
+
 # Ensure directories exist
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Navidrome library shared by all M3U jobs, created on first use
+shared_library = None
+shared_library_lock = threading.Lock()
+
 
 def load_settings():
     """Load settings from JSON file"""
@@ -100,6 +120,17 @@ def save_settings(settings):
         json.dump(settings, f, indent=2)
 
 
+def get_shared_library():
+    """Get the process-wide Navidrome library cache"""
+    global shared_library
+    with shared_library_lock:
+        if shared_library is None:
+            from spoti_playlist_to_m3u import SharedLibrary
+
+            shared_library = SharedLibrary(DATABASE_PATH)
+    return shared_library
+
+
 def get_spotify_oauth():
     return SpotifyOAuth(
         client_id=SPOTIFY_CLIENT_ID,
@@ -133,6 +164,7 @@ def is_session_valid():
 def create_secure_session(token_info):
     """Create a secure session with additional security markers"""
     session.clear()
+    session["client_id"] = secrets.token_hex(16)
     session["token_info"] = token_info
     session["session_created"] = datetime.now().isoformat()
     session["session_id"] = secrets.token_hex(16)
@@ -194,6 +226,19 @@ def require_auth(f):
     return decorated_function
 
 
+def client_id():
+    """Id of the browser session, which names the owner of the jobs it starts."""
+    if "client_id" not in session:
+        session["client_id"] = secrets.token_hex(16)
+    return session["client_id"]
+
+
+@app.before_request
+def ensure_client_id():
+    # Set before the page opens its socket, so the socket can join the session's jobs
+    client_id()
+
+
 @app.route("/")
 def dashboard():
     return render_template("dashboard.html", authenticated=validate_session_security())
@@ -329,6 +374,49 @@ def get_user_playlists():
         return jsonify({"error": str(e)}), 500
 
 
+def job_progress(job, describe, start=0, end=100, initial=0, fields=None):
+    """A ProgressReporter that emits `job`'s progress events, at most a few per second.
+
+    The state's fraction is scaled to start..end percent. `describe(state)`
+    gives the message, to which the rate and time left are added, and
+    `fields(state)` any extra payload fields.
+    """
+    from progress_reporter import ProgressReporter
+
+    def report(state):
+        message = describe(state)
+        if state.summary() and not state.final:
+            message = f"{message} ({state.summary()})"
+        payload = {
+            "message": message,
+            "progress": start + int(state.fraction * (end - start)),
+            **state.as_dict(),
+        }
+        if fields:
+            payload.update(fields(state))
+        job.emit("progress", payload)
+
+    return ProgressReporter(report, initial=initial)
+
+
+def new_track_file():
+    """Path for a fetch task's track file (NDJSON), kept for the later stages."""
+    fd, path = tempfile.mkstemp(suffix=".ndjson")
+    os.close(fd)
+    return path
+
+
+def is_track_file(path):
+    """Whether `path` is an existing track file made by new_track_file()."""
+    return (
+        bool(path)
+        and path.endswith(".ndjson")
+        and os.path.dirname(os.path.realpath(path))
+        == os.path.realpath(tempfile.gettempdir())
+        and os.path.isfile(path)
+    )
+
+
 @app.route("/api/fetch-playlist", methods=["POST"])
 def fetch_playlist():
     sp = get_spotify_client()
@@ -345,96 +433,61 @@ def fetch_playlist():
     if "playlist/" in playlist_id:
         playlist_id = playlist_id.split("playlist/")[1].split("?")[0]
 
-    def fetch_playlist_task():
+    def fetch_playlist_task(job):
         try:
-            socketio.emit(
+            job.emit(
                 "progress", {"message": "Starting playlist fetch...", "progress": 0}
             )
 
-            # Get playlist info
-            playlist = sp.playlist(playlist_id)
-            socketio.emit(
-                "progress",
-                {
-                    "message": f'Fetching tracks from "{playlist["name"]}"...',
-                    "progress": 10,
-                },
-            )
+            from spotify_fetch import cached_playlist_tracks
 
-            # Fetch all tracks
-            tracks = []
-            limit = 100
-            offset = 0
-
-            while True:
-                results = sp.playlist_items(playlist_id, limit=limit, offset=offset)
-                items = results["items"]
-                if not items:
-                    break
-
-                for item in items:
-                    track = item["track"]
-                    if track is None:
-                        continue
-                    tracks.append(
-                        {
-                            "track_id": track["id"],
-                            "track_name": track["name"],
-                            "artist_name": ", ".join(
-                                [artist["name"] for artist in track["artists"]]
-                            ),
-                            "artist_id": ", ".join(
-                                [artist["id"] for artist in track["artists"]]
-                            ),
-                            "album_name": track["album"]["name"],
-                            "album_id": track["album"]["id"],
-                            "added_at": item.get("added_at", ""),
-                            "track_uri": track["uri"],
-                            "popularity": track.get("popularity", ""),
-                            "duration_ms": track.get("duration_ms", ""),
-                        }
-                    )
-
-                offset += len(items)
-                progress = min(
-                    90, int((offset / playlist["tracks"]["total"]) * 80) + 10
-                )
-                socketio.emit(
-                    "progress",
-                    {"message": f"Fetched {offset} tracks...", "progress": progress},
-                )
+            report_progress = job_progress(
+                job, lambda state: f"Fetched {state.done} tracks...", start=10, end=90
+            )
 
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(
-                mode="w", suffix=".json", delete=False, encoding="utf-8"
+            # One metadata call when the playlist's snapshot_id is unchanged;
+            # otherwise pages are fetched concurrently and written out as they arrive
+            temp_file = new_track_file()
+            playlist, track_count, cached = cached_playlist_tracks(
+                sp, playlist_id, temp_file, on_progress=report_progress.update
             )
-            json.dump(tracks, temp_file, ensure_ascii=False, indent=2)
-            temp_file.close()
+            report_progress.finish()
 
-            socketio.emit(
+            job.emit(
                 "progress",
                 {
-                    "message": f"Completed! Fetched {len(tracks)} tracks.",
+                    "message": (
+                        f"Completed! {track_count} tracks"
+                        f"{' (unchanged since last fetch)' if cached else ''}."
+                    ),
                     "progress": 100,
                 },
             )
-            socketio.emit(
+            job.emit(
                 "playlist_fetched",
                 {
                     "playlist_name": playlist["name"],
-                    "track_count": len(tracks),
-                    "temp_file": temp_file.name,
-                    "tracks": tracks,  # Send all tracks for pagination
+                    "track_count": track_count,
+                    "cached": cached,
+                    # Tracks are paged in from /api/tracks as they're viewed
+                    "temp_file": temp_file,
                 },
             )
 
         except Exception as e:
-            socketio.emit("error", {"message": f"Error fetching playlist: {str(e)}"})
-
-    thread = threading.Thread(target=fetch_playlist_task)
-    thread.start()
+            job.emit("error", {"message": f"Error fetching playlist: {str(e)}"})
+
+    job = jobs.start(
+        "fetch_playlist",
+        client_id(),
+        fetch_playlist_task,
+        f"Playlist {playlist_id}",
+        key=playlist_id,
+    )
 
-    return jsonify({"message": "Playlist fetch started"})
+    return jsonify(
+        {"message": "Playlist fetch started", "job_id": job.id, "status": job.status}
+    )
 
 
 @app.route("/api/fetch-liked-songs", methods=["POST"])
@@ -443,104 +496,78 @@ def fetch_liked_songs():
     if not sp:
         return jsonify({"error": "Not authenticated"}), 401
 
-    def fetch_liked_task():
-        try:
-            socketio.emit(
-                "progress",
-                {"message": "Getting total count of liked songs...", "progress": 0},
-            )
+    # The liked-songs snapshot is kept per Spotify user
+    user_id = session.get("spotify_user_id")
+    if not user_id:
+        user_id = sp.current_user()["id"]
+        session["spotify_user_id"] = user_id
+    full_sync = bool((request.get_json(silent=True) or {}).get("full_sync"))
 
-            # First, get the total count by making a single request
-            initial_results = sp.current_user_saved_tracks(limit=1, offset=0)
-            total_tracks = initial_results["total"]
-
-            socketio.emit(
+    def fetch_liked_task(job):
+        try:
+            job.emit(
                 "progress",
-                {
-                    "message": f"Found {total_tracks} liked songs. Starting fetch...",
-                    "progress": 5,
-                },
+                {"message": "Fetching liked songs...", "progress": 0},
             )
 
-            tracks = []
-            limit = 50
-            offset = 0
-
-            while True:
-                results = sp.current_user_saved_tracks(limit=limit, offset=offset)
-                items = results["items"]
-                if not items:
-                    break
-
-                for item in items:
-                    track = item["track"]
-                    if track is None:
-                        continue
-                    tracks.append(
-                        {
-                            "track_id": track["id"],
-                            "track_name": track["name"],
-                            "artist_name": ", ".join(
-                                [artist["name"] for artist in track["artists"]]
-                            ),
-                            "artist_id": ", ".join(
-                                [artist["id"] for artist in track["artists"]]
-                            ),
-                            "album_name": track["album"]["name"],
-                            "album_id": track["album"]["id"],
-                            "added_at": item.get("added_at", ""),
-                            "track_uri": track["uri"],
-                            "popularity": track.get("popularity", ""),
-                            "duration_ms": track.get("duration_ms", ""),
-                        }
-                    )
-
-                offset += len(items)
-                # Calculate accurate progress: 5% for initial setup, 90% for fetching, 5% for saving
-                progress = 5 + int((offset / total_tracks) * 90)
-                socketio.emit(
-                    "progress",
-                    {
-                        "message": f"Fetched {offset} of {total_tracks} liked songs...",
-                        "progress": progress,
-                    },
-                )
+            from spotify_fetch import sync_liked_tracks
+            from track_records import iter_tracks
 
-            socketio.emit(
-                "progress", {"message": "Saving data to file...", "progress": 95}
+            report_progress = job_progress(
+                job,
+                lambda state: f"Fetched {state.done} of {state.total} liked songs...",
+                start=5,
+                end=95,
             )
 
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(
-                mode="w", suffix=".json", delete=False, encoding="utf-8"
+            # Only pages newer than the stored snapshot, unless a full refetch is due
+            temp_file = new_track_file()
+            track_count, total_tracks, sync_info = sync_liked_tracks(
+                sp,
+                user_id,
+                temp_file,
+                on_progress=report_progress.update,
+                full=full_sync,
             )
-            json.dump(tracks, temp_file, ensure_ascii=False, indent=2)
-            temp_file.close()
+            report_progress.finish()
 
-            socketio.emit(
+            job.emit(
                 "progress",
                 {
-                    "message": f"Completed! Fetched {len(tracks)} liked songs.",
+                    "message": (
+                        f"Completed! {track_count} liked songs, "
+                        f"{sync_info['new']} new ({sync_info['mode']} sync)."
+                    ),
                     "progress": 100,
                 },
             )
-            socketio.emit(
+            job.emit(
                 "liked_songs_fetched",
                 {
-                    "track_count": len(tracks),
+                    "track_count": track_count,
                     "total_count": total_tracks,
-                    "temp_file": temp_file.name,
-                    "tracks": tracks[:10],  # Send first 10 for preview
+                    "new_count": sync_info["new"],
+                    "sync_mode": sync_info["mode"],
+                    "temp_file": temp_file,
+                    # Send first 10 for preview
+                    "tracks": list(islice(iter_tracks(temp_file), 10)),
                 },
             )
 
         except Exception as e:
-            socketio.emit("error", {"message": f"Error fetching liked songs: {str(e)}"})
-
-    thread = threading.Thread(target=fetch_liked_task)
-    thread.start()
+            job.emit("error", {"message": f"Error fetching liked songs: {str(e)}"})
+
+    job = jobs.start(
+        "fetch_liked",
+        client_id(),
+        fetch_liked_task,
+        "Liked songs",
+        key=(user_id, full_sync),
+    )
 
-    return jsonify({"message": "Liked songs fetch started"})
+    return jsonify(
+        {"message": "Liked songs fetch started", "job_id": job.id, "status": job.status}
+    )
 
 
 @app.route("/api/generate-m3u", methods=["POST"])
@@ -552,15 +579,15 @@ def generate_m3u():
     if not temp_file or not os.path.exists(temp_file):
         return jsonify({"error": "Invalid temp file"}), 400
 
-    def generate_m3u_task():
+    def generate_m3u_task(job):
         try:
-            socketio.emit(
+            job.emit(
                 "progress", {"message": "Generating M3U playlist...", "progress": 0}
             )
 
             # Check if database exists before proceeding
             if not os.path.exists(DATABASE_PATH):
-                socketio.emit(
+                job.emit(
                     "error",
                     {
                         "message": f"Navidrome database not found at {DATABASE_PATH}. Please ensure your database is mounted correctly."
@@ -576,18 +603,41 @@ def generate_m3u():
             # Import and use the existing M3U generation function
             from spoti_playlist_to_m3u import generate_m3u_from_db
 
-            socketio.emit(
+            job.emit(
+                "progress",
+                {"message": "Loading Navidrome library...", "progress": 25},
+            )
+            library = get_shared_library().get()
+
+            job.emit(
                 "progress",
                 {
                     "message": "Processing tracks with Navidrome database...",
                     "progress": 50,
                 },
             )
-            generate_m3u_from_db(playlist_name, temp_file, output_file, test_mode=False)
+            progress = job_progress(
+                job,
+                lambda state: f"Processed {state.done}/{state.total} tracks, "
+                f"{state.details['matched']} matched...",
+                start=50,
+                end=99,
+            )
+            generate_m3u_from_db(
+                playlist_name,
+                temp_file,
+                output_file,
+                test_mode=False,
+                library=library,
+                on_progress=lambda done, total, matched: progress.update(
+                    done, total, matched=matched
+                ),
+            )
+            progress.finish()
 
             # Verify the file was actually created
             if not os.path.exists(output_file):
-                socketio.emit(
+                job.emit(
                     "error",
                     {
                         "message": "M3U file was not created. Check server logs for details."
@@ -595,20 +645,123 @@ def generate_m3u():
                 )
                 return
 
-            socketio.emit(
+            job.emit(
                 "progress",
                 {"message": "M3U playlist generated successfully!", "progress": 100},
             )
             # Send just the filename, not the full path (download endpoint adds OUTPUT_DIR)
-            socketio.emit("m3u_generated", {"file_path": os.path.basename(output_file)})
+            job.emit("m3u_generated", {"file_path": os.path.basename(output_file)})
 
         except Exception as e:
-            socketio.emit("error", {"message": f"Error generating M3U: {str(e)}"})
+            job.emit("error", {"message": f"Error generating M3U: {str(e)}"})
+
+    job = jobs.start(
+        "generate_m3u",
+        client_id(),
+        generate_m3u_task,
+        playlist_name,
+        key=(temp_file, playlist_name),
+    )
+
+    return jsonify(
+        {"message": "M3U generation started", "job_id": job.id, "status": job.status}
+    )
+
+
+def run_mb_scan(job, journal):
+    """Resolve a scan job's albums and write its _mb_albums.json and _mb_failed.json.
+
+    Each answered album is checkpointed to the job's journal, so a scan that is
+    interrupted can be resumed and skips the albums it already resolved.
+    """
+    from process_spotify_mb import scan_albums
+
+    try:
+        albums = journal.albums
+        total_albums = len(albums)
+        already_done = len(journal.resolved())
+        message = f"Found {total_albums} unique albums. Scanning MusicBrainz..."
+        if already_done:
+            message = (
+                f"Resuming scan: {already_done}/{total_albums} albums already resolved..."
+            )
+        job.emit("progress", {"message": message, "progress": 10})
+
+        def describe(state):
+            info, stats = state.details["info"], state.details["stats"]
+            return (
+                f"Scanned {state.done}/{state.total}: {info['artist']} - {info['album']} "
+                f"({stats['cache_hits']} cached, {stats['offline_hits']} offline, "
+                f"{stats['cache_misses']} looked up)"
+            )
 
-    thread = threading.Thread(target=generate_m3u_task)
-    thread.start()
+        def scan_fields(state):
+            stats = state.details["stats"]
+            return {
+                "cache_hits": stats["cache_hits"],
+                "offline_hits": stats["offline_hits"],
+                "cache_misses": stats["cache_misses"],
+                "scan_job_id": journal.job_id,
+            }
+
+        # Albums resumed from the journal don't count towards the scan rate
+        progress = job_progress(
+            job, describe, start=10, end=90, initial=already_done, fields=scan_fields
+        )
 
-    return jsonify({"message": "M3U generation started"})
+        def report_progress(done, total, info, mb_id, stats):
+            progress.update(done, total, info=info, stats=stats)
+
+        # Lookups share the process-wide MusicBrainz rate limiter and lookup cache
+        result, failed_matches, stats = scan_albums(
+            albums, on_progress=report_progress, journal=journal
+        )
+        progress.finish()
+
+        # Save results to OUTPUT_DIR
+        safe_name = journal.name.replace(" ", "_")
+        mb_output_file = os.path.join(OUTPUT_DIR, f"{safe_name}_mb_albums.json")
+        failed_output_file = os.path.join(OUTPUT_DIR, f"{safe_name}_mb_failed.json")
+
+        with open(mb_output_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+        with open(failed_output_file, "w", encoding="utf-8") as f:
+            json.dump(failed_matches, f, indent=2, ensure_ascii=False)
+
+        # Results are on disk, so the checkpoint is no longer needed
+        journal.remove()
+
+        job.emit("progress", {"message": "MusicBrainz scan complete!", "progress": 100})
+        # Build list of found album keys for frontend matching
+        found_albums = [
+            {"artist": r["artist"].lower(), "album": r["album"].lower()}
+            for r in result
+        ]
+        job.emit(
+            "mb_scan_complete",
+            {
+                "message": f"Found {len(result)} albums, {len(failed_matches)} failed",
+                "found": len(result),
+                "failed": len(failed_matches),
+                "mb_file": os.path.basename(mb_output_file),
+                "found_albums": found_albums,
+                "cache_hits": stats["cache_hits"],
+                "offline_hits": stats["offline_hits"],
+                "cache_misses": stats["cache_misses"],
+                "resumed": stats["resumed"],
+                "scan_job_id": journal.job_id,
+            },
+        )
+
+    except Exception as e:
+        job.emit(
+            "error",
+            {
+                "message": f"Error scanning MusicBrainz: {str(e)}",
+                "scan_job_id": journal.job_id,
+            },
+        )
 
 
 @app.route("/api/scan-mb-albums", methods=["POST"])
@@ -621,110 +774,74 @@ def scan_mb_albums():
     if not temp_file or not os.path.exists(temp_file):
         return jsonify({"error": "Invalid temp file"}), 400
 
-    def scan_mb_task():
+    def scan_mb_task(job):
         try:
-            socketio.emit(
+            job.emit(
                 "progress",
                 {"message": "Starting MusicBrainz album scan...", "progress": 0},
             )
 
-            from process_spotify_mb import clean_string, query_mb_releasegroup
-
-            # Load the playlist tracks
-            with open(temp_file, encoding="utf-8") as f:
-                playlist_tracks = json.load(f)
-
-            # Extract unique albums
-            albums = {}
-            for entry in playlist_tracks:
-                artist_raw = entry.get("artist_name") or entry.get("artist") or ""
-                album_raw = entry.get("album_name") or entry.get("album") or ""
-                if not album_raw or not artist_raw:
-                    continue
-                primary_artist = clean_string(artist_raw.split(",")[0])
-                album = clean_string(album_raw)
-                key = (primary_artist.lower(), album.lower())
-                if key not in albums:
-                    albums[key] = {
-                        "artist": primary_artist,
-                        "album": album,
-                        "tracks": [],
-                    }
-                albums[key]["tracks"].append(entry)
-
-            total_albums = len(albums)
-            socketio.emit(
-                "progress",
-                {
-                    "message": f"Found {total_albums} unique albums. Scanning MusicBrainz...",
-                    "progress": 10,
-                },
-            )
+            from process_spotify_mb import ScanJournal, collect_albums
+            from track_records import iter_tracks
 
-            result = []
-            failed_matches = []
+            # Extract unique albums as the tracks are read; scanning the same
+            # playlist again resumes its job
+            albums = collect_albums(iter_tracks(temp_file))
+            journal = ScanJournal.create(playlist_name, albums)
 
-            for idx, ((artist_key, album_key), info) in enumerate(albums.items()):
-                artist = info["artist"]
-                album = info["album"]
-                progress = 10 + int((idx / total_albums) * 80)
-                socketio.emit(
-                    "progress",
-                    {"message": f"Scanning: {artist} - {album}", "progress": progress},
-                )
+        except Exception as e:
+            job.emit("error", {"message": f"Error scanning MusicBrainz: {str(e)}"})
+            return
 
-                mb_id = query_mb_releasegroup(artist, album)
-                if not mb_id and artist:
-                    mb_id = query_mb_releasegroup("", album)
+        run_mb_scan(job, journal)
 
-                if mb_id:
-                    result.append(
-                        {"MusicBrainzId": mb_id, "artist": artist, "album": album}
-                    )
-                else:
-                    failed_matches.append(
-                        {"artist": artist, "album": album, "tracks": info["tracks"]}
-                    )
+    job = jobs.start(
+        "mb_scan",
+        client_id(),
+        scan_mb_task,
+        playlist_name,
+        key=(temp_file, playlist_name),
+    )
 
-                time.sleep(1.1)  # MusicBrainz rate limit
+    return jsonify(
+        {"message": "MusicBrainz scan started", "job_id": job.id, "status": job.status}
+    )
 
-            # Save results to OUTPUT_DIR
-            safe_name = playlist_name.replace(" ", "_")
-            mb_output_file = os.path.join(OUTPUT_DIR, f"{safe_name}_mb_albums.json")
-            failed_output_file = os.path.join(OUTPUT_DIR, f"{safe_name}_mb_failed.json")
 
-            with open(mb_output_file, "w", encoding="utf-8") as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
+@app.route("/api/mb-scan-jobs")
+def list_mb_scan_jobs():
+    """List interrupted MusicBrainz scans that can be resumed"""
+    from process_spotify_mb import ScanJournal
 
-            with open(failed_output_file, "w", encoding="utf-8") as f:
-                json.dump(failed_matches, f, indent=2, ensure_ascii=False)
+    return jsonify({"jobs": ScanJournal.list_jobs()})
 
-            socketio.emit(
-                "progress", {"message": "MusicBrainz scan complete!", "progress": 100}
-            )
-            # Build list of found album keys for frontend matching
-            found_albums = [
-                {"artist": r["artist"].lower(), "album": r["album"].lower()}
-                for r in result
-            ]
-            socketio.emit(
-                "mb_scan_complete",
-                {
-                    "message": f"Found {len(result)} albums, {len(failed_matches)} failed",
-                    "found": len(result),
-                    "failed": len(failed_matches),
-                    "mb_file": os.path.basename(mb_output_file),
-                    "found_albums": found_albums,
-                },
-            )
 
-        except Exception as e:
-            socketio.emit("error", {"message": f"Error scanning MusicBrainz: {str(e)}"})
+@app.route("/api/mb-scan-jobs/<job_id>/resume", methods=["POST"])
+def resume_mb_scan_job(job_id):
+    """Resume an interrupted MusicBrainz scan from its journal"""
+    from process_spotify_mb import ScanJournal
 
-    thread = threading.Thread(target=scan_mb_task)
-    thread.start()
+    try:
+        journal = ScanJournal.open(job_id)
+    except (OSError, ValueError, KeyError):
+        return jsonify({"error": "Scan job not found"}), 404
+
+    job = jobs.start(
+        "mb_scan",
+        client_id(),
+        lambda job: run_mb_scan(job, journal),
+        journal.name,
+        key=journal.job_id,
+    )
 
-    return jsonify({"message": "MusicBrainz scan started"})
+    return jsonify(
+        {
+            "message": "MusicBrainz scan resumed",
+            "job_id": job.id,
+            "status": job.status,
+            "scan_job_id": journal.job_id,
+        }
+    )
 
 
 @app.route("/api/send-to-lidarr", methods=["POST"])
@@ -742,9 +859,9 @@ def send_to_lidarr():
     if not os.path.exists(mb_file_path):
         return jsonify({"error": f"MusicBrainz file not found: {mb_file}"}), 400
 
-    def send_to_lidarr_task():
+    def send_to_lidarr_task(job):
         try:
-            socketio.emit(
+            job.emit(
                 "progress", {"message": "Loading MusicBrainz albums...", "progress": 0}
             )
 
@@ -752,32 +869,31 @@ def send_to_lidarr():
                 mb_albums = json.load(f)
 
             if not mb_albums:
-                socketio.emit(
-                    "error", {"message": "No albums found in MusicBrainz file"}
-                )
+                job.emit("error", {"message": "No albums found in MusicBrainz file"})
                 return
 
-            # Load saved settings
+            from mb_lidarr_sync import (
+                LidarrSettings,
+                lidarr_connection_error,
+                sync_release_groups,
+            )
+
+            # Load saved settings (fallback to env vars)
             saved_settings = load_settings()
             lidarr_settings = saved_settings.get("lidarr", {})
-
-            # Build environment with saved settings (fallback to env vars)
-            env = os.environ.copy()
-            env["LIDARR_URL"] = lidarr_settings.get("url") or os.getenv(
-                "LIDARR_URL", ""
-            )
-            env["API_KEY"] = lidarr_settings.get("api_key") or os.getenv("API_KEY", "")
-            env["ROOT_FOLDER_PATH"] = lidarr_settings.get("root_folder") or os.getenv(
-                "ROOT_FOLDER_PATH", "/music/"
-            )
-            env["QUALITY_PROFILE_ID"] = str(
-                lidarr_settings.get("quality_profile_id", 1)
-            )
-            env["METADATA_PROFILE_ID"] = str(
-                lidarr_settings.get("metadata_profile_id", 1)
+            settings = LidarrSettings(
+                url=lidarr_settings.get("url"),
+                api_key=lidarr_settings.get("api_key"),
+                root_folder_path=lidarr_settings.get("root_folder"),
+                quality_profile_id=lidarr_settings.get("quality_profile_id", 1),
+                metadata_profile_id=lidarr_settings.get("metadata_profile_id", 1),
             )
 
-            socketio.emit(
+            connection_error = lidarr_connection_error(settings)
+            if connection_error:
+                raise Exception(f"ERROR: {connection_error}")
+
+            job.emit(
                 "progress",
                 {
                     "message": f"Adding {len(mb_albums)} albums to Lidarr...",
@@ -785,42 +901,48 @@ def send_to_lidarr():
                 },
             )
 
-            # Run the Lidarr sync script with the MB file
-            result = subprocess.run(
-                ["python", "scripts/mb_lidarr_sync.py", mb_file_path],
-                capture_output=True,
-                text=True,
-                cwd=".",
-                env=env,
+            def describe(state):
+                counts = state.details["counts"]
+                return (
+                    f"Synced {state.done}/{state.total} albums ({counts['added']} added, "
+                    f"{counts['existing']} existing, {counts['failed']} failed)"
+                )
+
+            progress = job_progress(job, describe, start=20, end=95)
+
+            def report_progress(done, total, counts):
+                progress.update(done, total, counts=counts)
+
+            counts = sync_release_groups(
+                mb_albums, settings, on_progress=report_progress
             )
+            progress.finish()
 
-            if result.returncode != 0:
-                # Extract error message from output
-                error_msg = (
-                    result.stdout.strip() or result.stderr.strip() or "Unknown error"
-                )
-                # Look for ERROR: lines
-                for line in (result.stdout + result.stderr).split("\n"):
-                    if line.startswith("ERROR:"):
-                        error_msg = line
-                        break
-                raise Exception(error_msg)
-
-            socketio.emit(
+            job.emit(
                 "progress", {"message": "Successfully sent to Lidarr!", "progress": 100}
             )
-            socketio.emit(
+            job.emit(
                 "lidarr_complete",
-                {"message": f"{len(mb_albums)} albums processed by Lidarr"},
+                {
+                    "message": f"{len(mb_albums)} albums processed by Lidarr: "
+                    f"{counts['added']} added, {counts['existing']} existing, "
+                    f"{counts['failed']} failed",
+                    "added": counts["added"],
+                    "existing": counts["existing"],
+                    "failed": counts["failed"],
+                },
             )
 
         except Exception as e:
-            socketio.emit("error", {"message": f"Error sending to Lidarr: {str(e)}"})
+            job.emit("error", {"message": f"Error sending to Lidarr: {str(e)}"})
 
-    thread = threading.Thread(target=send_to_lidarr_task)
-    thread.start()
+    job = jobs.start(
+        "send_to_lidarr", client_id(), send_to_lidarr_task, mb_file, key=mb_file
+    )
 
-    return jsonify({"message": "Lidarr processing started"})
+    return jsonify(
+        {"message": "Lidarr processing started", "job_id": job.id, "status": job.status}
+    )
 
 
 @app.route("/api/test-lidarr", methods=["POST"])
@@ -932,6 +1054,38 @@ def test_navidrome():
         return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
 
 
+@app.route("/api/tracks")
+def get_tracks():
+    """One page of a fetched track file, optionally sorted and searched"""
+    temp_file = request.args.get("temp_file", "")
+    if not is_track_file(temp_file):
+        return jsonify({"error": "Invalid temp file"}), 400
+
+    try:
+        offset = max(0, int(request.args.get("offset", 0)))
+        limit = min(MAX_TRACK_PAGE, max(1, int(request.args.get("limit", 50))))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+
+    from track_records import get_track_index
+
+    try:
+        # The file's line index is built once and reused for every page
+        matching, tracks = get_track_index(temp_file).page(
+            offset,
+            limit,
+            sort=request.args.get("sort") or None,
+            descending=request.args.get("order") == "desc",
+            query=request.args.get("q"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(
+        {"tracks": tracks, "total": matching, "offset": offset, "limit": limit}
+    )
+
+
 @app.route("/api/download-json", methods=["POST"])
 def download_json():
     data = request.get_json()
@@ -941,16 +1095,22 @@ def download_json():
     if not temp_file or not os.path.exists(temp_file):
         return jsonify({"error": "Invalid temp file"}), 400
 
-    try:
-        # Read the full data from the temporary file
-        with open(temp_file, "r", encoding="utf-8") as f:
-            full_data = json.load(f)
-
-        return jsonify({"success": True, "data": full_data, "count": len(full_data)})
+    from track_records import read_tracks
 
+    try:
+        count, tracks = read_tracks(temp_file)
     except Exception as e:
         return jsonify({"error": f"Failed to read data: {str(e)}"}), 500
 
+    def generate():
+        # Stream the response record by record instead of building it in memory
+        yield f'{{"success": true, "count": {count}, "data": ['
+        for i, track in enumerate(tracks):
+            yield ("," if i else "") + json.dumps(track, ensure_ascii=False)
+        yield "]}"
+
+    return Response(generate(), mimetype="application/json")
+
 
 @app.route("/download/<filename>")
 def download_file(filename):
@@ -961,6 +1121,56 @@ def download_file(filename):
         return jsonify({"error": str(e)}), 404
 
 
+@app.route("/api/jobs")
+def list_jobs():
+    """Background jobs started from this browser session"""
+    return jsonify({"jobs": [job.to_dict() for job in jobs.list(client_id())]})
+
+
+@app.route("/api/jobs/queue")
+def job_queue():
+    """Worker pools with their running and queued job counts, and this session's jobs in them"""
+    return jsonify({"pools": jobs.queue_status(client_id())})
+
+
+@app.errorhandler(QueueFull)
+def queue_full(e):
+    return jsonify({"error": str(e)}), 429
+
+
+@app.route("/api/jobs/<job_id>")
+def get_job(job_id):
+    # Other sessions' jobs are reported as missing
+    job = jobs.get(job_id, client_id())
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+@socketio.on("connect")
+def on_connect():
+    # Follow the jobs this session already has running, e.g. after a reload
+    jobs.connect(session.get("client_id"), request.sid)
+
+
+@socketio.on("disconnect")
+def on_disconnect():
+    jobs.disconnect(session.get("client_id"), request.sid)
+
+
+@socketio.on("attach_job")
+def on_attach_job(data):
+    """Start receiving a job's events; the job's latest progress is sent right away"""
+    job = jobs.attach((data or {}).get("job_id"), request.sid, session.get("client_id"))
+    return job.to_dict() if job else {"error": "Job not found"}
+
+
+@socketio.on("detach_job")
+def on_detach_job(data):
+    job = jobs.detach((data or {}).get("job_id"), request.sid, session.get("client_id"))
+    return job.to_dict() if job else {"error": "Job not found"}
+
+
 @app.route("/health")
 def health_check():
     """Health check endpoint for Docker"""
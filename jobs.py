@@ -0,0 +1,291 @@
+"""Background jobs of the web app, and the SocketIO rooms their events go to.
+
+Every job gets an id and a room, "job:<id>", and its events are emitted to that
+room only. The sockets of the browser session that started a job are put in
+its room, so other clients never receive its events. Sockets of the same
+session can also attach to a job by id (from another tab, or after a reload)
+and detach again; other sessions' jobs are treated as unknown.
+
+Jobs run in bounded worker pools, one per resource they load (Spotify, the
+Navidrome library, MusicBrainz, Lidarr), so a burst of requests queues up
+instead of starting a thread each. A job identical to one that is still
+queued or running is not started again; the pending one is returned instead.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+# Finished jobs kept for listing and late attaches
+FINISHED_JOBS_KEPT = 50
+# Jobs that may wait in one pool's queue before new ones are refused
+MAX_QUEUED_JOBS = 20
+
+
+class QueueFull(Exception):
+    """Raised by JobRegistry.start() when the pool's queue already holds max_queued jobs."""
+
+
+class JobPool:
+    """A FIFO queue of jobs and at most `workers` threads running them."""
+
+    def __init__(self, name, workers, kinds):
+        self.name = name
+        self.workers = workers
+        self.kinds = tuple(kinds)
+        self.queue = deque()
+        self.running = []
+        self.threads = 0
+
+
+class Job:
+    """One background task; its events reach only the sockets in its room."""
+
+    def __init__(self, registry, kind, owner, description=""):
+        self.id = secrets.token_hex(8)
+        self.kind = kind
+        self.owner = owner
+        self.description = description
+        self.status = "queued"
+        self.pool = None
+        self.key = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.last_progress = None
+        # The callable run by the pool, dropped once the job finishes
+        self.target = None
+        self._registry = registry
+
+    @property
+    def room(self):
+        return f"job:{self.id}"
+
+    def emit(self, event, data):
+        """Emit an event to the job's room, tagged with the job id."""
+        data = {**data, "job_id": self.id}
+        if event == "progress":
+            # Replayed to clients that attach later
+            self.last_progress = data
+        elif event == "error":
+            self.status = "error"
+        self._registry.socketio.emit(event, data, to=self.room)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "description": self.description,
+            "status": self.status,
+            "pool": self.pool,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": (self.last_progress or {}).get("progress", 0),
+            "message": (self.last_progress or {}).get("message", ""),
+        }
+
+
+class JobRegistry:
+    """Runs jobs in bounded worker pools and keeps track of which sockets follow them.
+
+    Every job kind must belong to a pool added with add_pool(). `owner` is the
+    id of the browser session that starts a job; connect() and disconnect()
+    keep track of each session's sockets.
+    """
+
+    def __init__(self, socketio, namespace="/", max_queued=MAX_QUEUED_JOBS):
+        self.socketio = socketio
+        self.namespace = namespace
+        self.max_queued = max_queued
+        self._jobs = OrderedDict()
+        self._sockets = defaultdict(set)
+        self._pools = OrderedDict()
+        self._pool_of_kind = {}
+        self._lock = threading.Lock()
+
+    def add_pool(self, name, workers, kinds):
+        """Run the jobs of `kinds` on at most `workers` threads, shared between those kinds."""
+        pool = JobPool(name, max(1, int(workers)), kinds)
+        with self._lock:
+            self._pools[name] = pool
+            for kind in pool.kinds:
+                self._pool_of_kind[kind] = pool
+        return pool
+
+    def _enter(self, sid, job):
+        self.socketio.server.enter_room(sid, job.room, namespace=self.namespace)
+
+    def connect(self, owner, sid):
+        """Register a session's socket and put it in the rooms of the session's running jobs."""
+        if not owner:
+            return
+        with self._lock:
+            self._sockets[owner].add(sid)
+            pending = [
+                job
+                for job in self._jobs.values()
+                if job.owner == owner and job.status in ("queued", "running")
+            ]
+        for job in pending:
+            self._enter(sid, job)
+
+    def disconnect(self, owner, sid):
+        with self._lock:
+            sockets = self._sockets.get(owner)
+            if sockets is not None:
+                sockets.discard(sid)
+                if not sockets:
+                    del self._sockets[owner]
+
+    def start(self, kind, owner, target, description="", key=None):
+        """Queue `target(job)` on the pool for `kind`; returns the job.
+
+        With a `key`, a queued or running job of the same kind, owner and key
+        is returned instead of queueing a duplicate. Raises QueueFull when the
+        pool's queue is full.
+        """
+        pool = self._pool_of_kind.get(kind)
+        if pool is None:
+            raise ValueError(f"No job pool for {kind!r}")
+        with self._lock:
+            if key is not None:
+                for pending in self._jobs.values():
+                    if (
+                        pending.kind == kind
+                        and pending.owner == owner
+                        and pending.key == key
+                        and pending.status in ("queued", "running")
+                    ):
+                        return pending
+            if len(pool.queue) >= self.max_queued:
+                raise QueueFull(
+                    f"Too many {pool.name} jobs waiting, try again in a moment"
+                )
+            job = Job(self, kind, owner, description)
+            job.pool = pool.name
+            job.key = key
+            job.target = target
+            self._jobs[job.id] = job
+            pool.queue.append(job)
+            waiting_behind = len(pool.running) + len(pool.queue) - 1
+            start_worker = pool.threads < pool.workers
+            if start_worker:
+                pool.threads += 1
+            sockets = list(self._sockets.get(owner, ()))
+        for sid in sockets:
+            self._enter(sid, job)
+
+        if start_worker:
+            threading.Thread(target=self._work, args=(pool,), daemon=True).start()
+        elif waiting_behind:
+            job.emit(
+                "progress",
+                {
+                    "message": f"Queued behind {waiting_behind} {pool.name} "
+                    f"job{'s' if waiting_behind != 1 else ''}...",
+                    "progress": 0,
+                },
+            )
+        return job
+
+    def _work(self, pool):
+        """Worker thread: run the pool's queued jobs in order until the queue is empty."""
+        while True:
+            with self._lock:
+                if not pool.queue:
+                    pool.threads -= 1
+                    return
+                job = pool.queue.popleft()
+                job.status = "running"
+                job.started_at = time.time()
+                pool.running.append(job)
+            try:
+                job.target(job)
+            except Exception as e:
+                job.emit("error", {"message": f"Error: {e}"})
+            finally:
+                self._finish(pool, job)
+
+    def _finish(self, pool, job):
+        with self._lock:
+            pool.running.remove(job)
+            job.target = None
+            if job.status == "running":
+                job.status = "done"
+            job.finished_at = time.time()
+            finished = [j.id for j in self._jobs.values() if j.finished_at]
+            for job_id in finished[:-FINISHED_JOBS_KEPT]:
+                del self._jobs[job_id]
+
+    def get(self, job_id, owner=None):
+        """The job with this id; with `owner`, only if that session started it."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def list(self, owner=None):
+        """Jobs, oldest first; only those started by `owner` when given."""
+        with self._lock:
+            return [
+                job
+                for job in self._jobs.values()
+                if owner is None or job.owner == owner
+            ]
+
+    def queue_status(self, owner=None):
+        """Per pool: its worker limit, running and queued counts, and `owner`'s pending jobs.
+
+        Queue positions count from 1 for the next job to run.
+        """
+        with self._lock:
+            status = []
+            for pool in self._pools.values():
+                pending = [(None, job) for job in pool.running] + list(
+                    enumerate(pool.queue, 1)
+                )
+                status.append(
+                    {
+                        "pool": pool.name,
+                        "kinds": list(pool.kinds),
+                        "workers": pool.workers,
+                        "running": len(pool.running),
+                        "queued": len(pool.queue),
+                        "jobs": [
+                            {**job.to_dict(), "queue_position": position}
+                            for position, job in pending
+                            if owner is None or job.owner == owner
+                        ],
+                    }
+                )
+            return status
+
+    def attach(self, job_id, sid, owner):
+        """Add a socket to a job's room and replay its latest progress to it.
+
+        Only sockets of the session that started the job may follow it.
+        """
+        if not owner:
+            return None
+        job = self.get(job_id, owner)
+        if job is None:
+            return None
+        self._enter(sid, job)
+        if job.last_progress:
+            self.socketio.emit(
+                "progress", job.last_progress, to=sid, namespace=self.namespace
+            )
+        return job
+
+    def detach(self, job_id, sid, owner):
+        """Stop sending a job's events to a socket."""
+        if not owner:
+            return None
+        job = self.get(job_id, owner)
+        if job is None:
+            return None
+        self.socketio.server.leave_room(sid, job.room, namespace=self.namespace)
+        return job
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare memory use of the dict and columnar NavidromeLibrary layouts.
+
+Usage:
+  python scripts/bench_library_memory.py                 # synthetic 100k-track library
+  python scripts/bench_library_memory.py --tracks 400000
+  python scripts/bench_library_memory.py /path/to/navidrome.db
+"""
+import gc
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from spoti_playlist_to_m3u import library_class
+
+WORDS = [
+    'love', 'night', 'blue', 'heart', 'fire', 'rain', 'dream', 'home', 'light',
+    'summer', 'dance', 'gold', 'river', 'ghost', 'city', 'midnight', 'wild',
+]
+
+def build_synthetic_db(path, track_count):
+    """Write a media_file table shaped like Navidrome's with track_count rows."""
+    rng = random.Random(42)
+    artists = [f"{rng.choice(WORDS).title()} Artist {i}" for i in range(max(track_count // 40, 1))]
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE media_file (
+            id VARCHAR(255) PRIMARY KEY, path VARCHAR(255), title VARCHAR(255),
+            artist VARCHAR(255), album_artist VARCHAR(255), album VARCHAR(255),
+            duration REAL, updated_at DATETIME, created_at DATETIME
+        )
+    """)
+    rows = []
+    for i in range(track_count):
+        artist = rng.choice(artists)
+        album = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}"
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+        rows.append((
+            f"{i:032x}", f"{artist}/{album}/{i % 14 + 1:02d} - {title}.flac", title,
+            artist, artist, album, rng.uniform(90, 420),
+            '2024-01-01 00:00:00', '2024-01-01 00:00:00',
+        ))
+    conn.executemany("INSERT INTO media_file VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+def measure(conn, layout):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    library = library_class(layout)(conn)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return library, retained, peak, elapsed
+
+def main():
+    args = sys.argv[1:]
+    track_count = 100000
+    if '--tracks' in args:
+        track_count = int(args[args.index('--tracks') + 1])
+    db_path = next((a for a in args if a.endswith('.db')), None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if db_path is None:
+            db_path = os.path.join(tmp, 'navidrome.db')
+            print(f"Building synthetic library with {track_count} tracks...")
+            build_synthetic_db(db_path, track_count)
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+
+        results = {}
+        for layout in ('dict', 'columnar'):
+            library, retained, peak, elapsed = measure(conn, layout)
+            results[layout] = retained
+            print(
+                f"{layout:>9}: {retained / 2**20:8.1f} MiB retained, "
+                f"{peak / 2**20:8.1f} MiB peak, load {elapsed:.2f}s"
+            )
+            del library
+        conn.close()
+
+    print(f"columnar uses {results['columnar'] / results['dict']:.0%} of the dict layout")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Compare per-request latency of curl subprocesses and the pooled MusicBrainz session.
+
+Runs against a local stub of the release-group search endpoint, with the rate
+limiter disabled, so only client overhead is measured.
+
+Usage:
+  python scripts/bench_mb_client.py [--requests 200]
+"""
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import process_spotify_mb
+
+STUB_RESPONSE = json.dumps({
+    'created': '2024-01-01T00:00:00.000Z',
+    'count': 1,
+    'offset': 0,
+    'release-groups': [{
+        'id': 'b1392450-e666-3926-a536-22c65f834433',
+        'title': 'Stub Album',
+        'primary-type': 'Album',
+        'artist-credit': [{'name': 'Stub Artist'}],
+    }],
+}).encode('utf-8')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like musicbrainz.org
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(STUB_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(STUB_RESPONSE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class NoLimit:
+    def acquire(self):
+        pass
+
+    def pause(self, seconds):
+        pass
+
+
+def time_requests(fn, count):
+    latencies = []
+    for i in range(count):
+        started = time.perf_counter()
+        fn(f"Artist {i}", f"Album {i}")
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def curl_lookup(base_url):
+    def lookup(artist, album):
+        params = urllib.parse.urlencode({
+            'query': f'releasegroup:"{album}" AND artist:"{artist}"',
+            'fmt': 'json',
+            'limit': 1,
+        })
+        result = subprocess.run(
+            ['curl', '-s', '-H', f'User-Agent: {process_spotify_mb.MB_USER_AGENT}',
+             f'{base_url}/release-group/?{params}'],
+            capture_output=True, text=True, timeout=15,
+        )
+        return json.loads(result.stdout)['release-groups'][0]['id']
+    return lookup
+
+
+def report(name, latencies):
+    print(
+        f"{name:>8}: mean {statistics.mean(latencies):6.2f} ms, "
+        f"median {statistics.median(latencies):6.2f} ms, "
+        f"p95 {sorted(latencies)[int(len(latencies) * 0.95) - 1]:6.2f} ms"
+    )
+
+
+def main():
+    args = sys.argv[1:]
+    count = int(args[args.index('--requests') + 1]) if '--requests' in args else 200
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/ws/2"
+
+    process_spotify_mb.MB_BASE_URL = base_url
+    process_spotify_mb.mb_rate_limiter = NoLimit()
+
+    print(f"{count} lookups against stub at {base_url}")
+    results = {}
+    if shutil.which('curl'):
+        results['curl'] = time_requests(curl_lookup(base_url), count)
+        report('curl', results['curl'])
+    else:
+        print("    curl: not installed, skipping")
+    results['pooled'] = time_requests(process_spotify_mb.query_mb_releasegroup, count)
+    report('pooled', results['pooled'])
+
+    if 'curl' in results:
+        speedup = statistics.mean(results['curl']) / statistics.mean(results['pooled'])
+        print(f"pooled session is {speedup:.1f}x faster per request (before TLS, which it also reuses)")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Compare full and `fields`-projected Spotify playlist pages: bytes on the wire and parse time.
+
+Benchmarks a recorded playlist_items page: the one given with --fixture, or
+else scripts/fixtures/spotify_playlist_page.json once --record has written it.
+Without either it falls back to a synthetic page shaped like Spotify's full
+response, whose numbers are only an estimate. The projected page is what
+PLAYLIST_ITEM_FIELDS asks Spotify for.
+
+Usage:
+  python scripts/bench_spotify_fields.py                        # the recorded fixture, or a synthetic page
+  python scripts/bench_spotify_fields.py --fixture page.json    # another recorded page
+  python scripts/bench_spotify_fields.py --record PLAYLIST_ID [page.json]   # record an anonymized page
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+from spotify_fetch import PLAYLIST_ITEM_FIELDS, PLAYLIST_PAGE_SIZE, strip_item, track_record
+
+# Where --record writes the page and where the benchmark looks for it first
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'spotify_playlist_page.json')
+
+# Roughly the markets list Spotify attaches to every track and album
+MARKETS = [f"{a}{b}" for a in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ' for b in 'ABCDEFG'][:185]
+
+
+def spotify_object(kind, object_id, name=None):
+    obj = {
+        'external_urls': {'spotify': f"https://open.spotify.com/{kind}/{object_id}"},
+        'href': f"https://api.spotify.com/v1/{kind}s/{object_id}",
+        'id': object_id,
+        'type': kind,
+        'uri': f"spotify:{kind}:{object_id}",
+    }
+    if name is not None:
+        obj['name'] = name
+    return obj
+
+
+def synthetic_page(size=PLAYLIST_PAGE_SIZE):
+    """A playlist_items page with the same shape and field sizes as a real one."""
+    rng = random.Random(7)
+
+    def spotify_id():
+        return ''.join(rng.choice('0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(22))
+
+    items = []
+    for i in range(size):
+        artists = [spotify_object('artist', spotify_id(), f"Artist {rng.randrange(5000)}") for _ in range(rng.choice((1, 1, 2)))]
+        album = spotify_object('album', spotify_id(), f"Album {rng.randrange(20000)}")
+        album.update({
+            'album_type': 'album',
+            'total_tracks': rng.randrange(1, 20),
+            'available_markets': MARKETS,
+            'images': [
+                {'height': px, 'width': px, 'url': f"https://i.scdn.co/image/ab67616d0000{px:04d}{spotify_id()}"}
+                for px in (640, 300, 64)
+            ],
+            'release_date': '2019-05-17',
+            'release_date_precision': 'day',
+            'artists': artists,
+        })
+        track = spotify_object('track', spotify_id(), f"Track {i}")
+        track.update({
+            'album': album,
+            'artists': artists,
+            'available_markets': MARKETS,
+            'disc_number': 1,
+            'duration_ms': rng.randrange(120000, 360000),
+            'episode': False,
+            'explicit': False,
+            'external_ids': {'isrc': f"USRC1{rng.randrange(10 ** 7):07d}"},
+            'is_local': False,
+            'popularity': rng.randrange(100),
+            'preview_url': f"https://p.scdn.co/mp3-preview/{spotify_id()}",
+            'track': True,
+            'track_number': rng.randrange(1, 15),
+        })
+        items.append({
+            'added_at': '2023-02-11T18:04:52Z',
+            'added_by': spotify_object('user', spotify_id()),
+            'is_local': False,
+            'primary_color': None,
+            'track': track,
+            'video_thumbnail': {'url': None},
+        })
+    return {
+        'href': 'https://api.spotify.com/v1/playlists/x/tracks?offset=0&limit=100',
+        'items': items,
+        'limit': size,
+        'next': 'https://api.spotify.com/v1/playlists/x/tracks?offset=100&limit=100',
+        'offset': 0,
+        'previous': None,
+        'total': size * 10,
+    }
+
+
+def projected_page(page):
+    """What Spotify returns for the same page when asked for PLAYLIST_ITEM_FIELDS."""
+    return {'items': [strip_item(item) for item in page['items']], 'next': page.get('next'), 'total': page.get('total')}
+
+
+def anonymize(page, playlist_id):
+    """Drop what identifies the recording user and playlist; track metadata is public catalog data."""
+    anonymous_user = spotify_object('user', 'anonymous')
+    for item in page['items']:
+        if item.get('added_by'):
+            item['added_by'] = anonymous_user
+    for key in ('href', 'next', 'previous'):
+        if page.get(key):
+            page[key] = page[key].replace(playlist_id, 'x')
+    return page
+
+
+def record_page(playlist_id, path):
+    import spotipy
+    from dotenv import load_dotenv
+    from spotipy.oauth2 import SpotifyOAuth
+
+    load_dotenv()
+    sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
+        client_id=os.getenv('CLIENT_ID'),
+        client_secret=os.getenv('CLIENT_SECRET'),
+        redirect_uri=os.getenv('REDIRECT_URI'),
+        scope='playlist-read-private playlist-read-collaborative'
+    ))
+    page = anonymize(sp.playlist_items(playlist_id, limit=PLAYLIST_PAGE_SIZE), playlist_id)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(page, f)
+    projected = sp.playlist_items(playlist_id, fields=PLAYLIST_ITEM_FIELDS, limit=PLAYLIST_PAGE_SIZE)
+    print(f"Recorded {len(page['items'])} items to {path} ({len(json.dumps(projected))} bytes projected by Spotify)")
+
+
+def measure(name, body, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        page = json.loads(body)
+        [track_record(item) for item in page['items']]
+    per_page = (time.perf_counter() - started) / rounds * 1000
+    gzipped = len(gzip.compress(body))
+    print(f"{name:>9}: {len(body) / 1024:8.1f} KiB raw, {gzipped / 1024:6.1f} KiB gzip, {per_page:6.2f} ms parse+map per page")
+    return len(body), gzipped, per_page
+
+
+def main():
+    args = sys.argv[1:]
+    if '--record' in args:
+        i = args.index('--record')
+        path = args[i + 2] if len(args) > i + 2 else FIXTURE_PATH
+        record_page(args[i + 1], path)
+        return
+
+    fixture = args[args.index('--fixture') + 1] if '--fixture' in args else FIXTURE_PATH
+    if '--fixture' in args or os.path.exists(fixture):
+        with open(fixture, encoding='utf-8') as f:
+            page = json.load(f)
+        source = f'recorded page ({fixture})'
+    else:
+        page = synthetic_page()
+        source = 'synthetic page'
+        print(f"No recorded page at {FIXTURE_PATH}; the numbers below are an estimate. "
+              "Record one with --record PLAYLIST_ID.")
+
+    rounds = 200
+    print(f"{len(page['items'])}-item {source}, {rounds} rounds")
+    full = measure('full', json.dumps(page).encode('utf-8'), rounds)
+    projected = measure('projected', json.dumps(projected_page(page)).encode('utf-8'), rounds)
+    print(
+        f"projection: {full[0] / projected[0]:.1f}x fewer raw bytes, {full[1] / projected[1]:.1f}x fewer gzip bytes, "
+        f"{full[2] / projected[2]:.1f}x faster to parse"
+    )
+
+
+if __name__ == '__main__':
+    main()
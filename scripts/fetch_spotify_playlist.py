@@ -1,10 +1,13 @@
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
-import csv
-import json
 import os
+import sys
 from dotenv import load_dotenv
 
+from progress_reporter import ProgressReporter
+from spotify_fetch import cached_playlist_tracks
+from track_records import export_tracks, iter_tracks
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -21,53 +24,25 @@ sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
     scope=SCOPE
 ))
 
-# Put your playlist ID here (the part after 'playlist/' in the URL)
+# Put your playlist ID here (the part after 'playlist/' in the URL), or pass one or more IDs as arguments
 PLAYLIST_ID = '3cXFWPgBhhMy3k2z8HXama'
 
-playlist_tracks = []
-limit = 100
-offset = 0
-
-print("Fetching playlist tracks...")
-while True:
-    results = sp.playlist_items(PLAYLIST_ID, limit=limit, offset=offset)
-    items = results['items']
-    if not items:
-        break
-    for item in items:
-        track = item['track']
-        if track is None:  # skip removed tracks
-            continue
-        playlist_tracks.append({
-            'track_id': track['id'],
-            'track_name': track['name'],
-            'artist_name': ', '.join([artist['name'] for artist in track['artists']]),
-            'artist_id': ', '.join([artist['id'] for artist in track['artists']]),
-            'album_name': track['album']['name'],
-            'album_id': track['album']['id'],
-            'added_at': item.get('added_at', ''),
-            'track_uri': track['uri'],
-            'popularity': track.get('popularity', ''),
-            'duration_ms': track.get('duration_ms', '')
-        })
-    offset += len(items)
-    if offset % 200 == 0:
-        print(f"Fetched {offset} playlist songs so far...")
-
-print(f"Fetched {len(playlist_tracks)} playlist songs.")
-
-# Save to JSON
-with open('playlist_tracks.json', 'w', encoding='utf-8') as f:
-    json.dump(playlist_tracks, f, ensure_ascii=False, indent=2)
-print("Exported playlist songs to playlist_tracks.json")
-
-# Save to CSV
-if playlist_tracks:
-    keys = playlist_tracks[0].keys()
-    with open('playlist_tracks.csv', 'w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, keys)
-        writer.writeheader()
-        writer.writerows(playlist_tracks)
-    print("Exported playlist songs to playlist_tracks.csv")
-else:
-    print("No tracks found to export.")
+playlist_ids = sys.argv[1:] or [PLAYLIST_ID]
+for playlist_id in playlist_ids:
+    print(f"Fetching playlist {playlist_id}...")
+    # A single playlist keeps the historical output names
+    basename = 'playlist_tracks' if len(playlist_ids) == 1 else f'playlist_tracks_{playlist_id}'
+    # Playlists whose snapshot_id hasn't changed since the last run come from the cache
+    progress = ProgressReporter(
+        lambda state: print(f"Fetched {state.done} of {state.total} playlist songs so far... {state.summary()}")
+    )
+    playlist, count, cached = cached_playlist_tracks(
+        sp, playlist_id, f'{basename}.ndjson', on_progress=progress.update
+    )
+    progress.finish()
+    print(f"{'Unchanged since last fetch' if cached else 'Fetched'}: {count} songs in \"{playlist['name']}\".")
+
+    if export_tracks(iter_tracks(f'{basename}.ndjson'), basename):
+        print(f"Exported playlist songs to {basename}.ndjson, {basename}.json and {basename}.csv")
+    else:
+        print("No tracks found to export.")
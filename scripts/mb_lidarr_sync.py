@@ -1,9 +1,14 @@
 import json
 import os
-import time
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from progress_reporter import ProgressReporter
 
 # Load environment variables from .env file
 load_dotenv()
@@ -15,9 +20,62 @@ RELEASEGROUPS_FILE = "lidarr_mb_releasegroups.json"
 ROOT_FOLDER_PATH = os.getenv("ROOT_FOLDER_PATH", "/music/")
 METADATA_PROFILE_ID = int(os.getenv("METADATA_PROFILE_ID", 1))
 QUALITY_PROFILE_ID = int(os.getenv("QUALITY_PROFILE_ID", 1))
-REQUEST_DELAY = 1.1  # Seconds between API requests
-
-HEADERS = {"X-Api-Key": API_KEY}
+# Albums synced at once; Lidarr is our own server, so tune this to what it handles
+LIDARR_MAX_IN_FLIGHT = int(os.getenv("LIDARR_MAX_IN_FLIGHT", 4))
+REQUEST_TIMEOUT = 30  # Seconds
+# Album IDs per AlbumSearch command (1 searches each album on its own), and the
+# longest a queued search waits for its batch to fill
+LIDARR_SEARCH_BATCH_SIZE = int(os.getenv("LIDARR_SEARCH_BATCH_SIZE", 50))
+LIDARR_SEARCH_FLUSH_SECONDS = float(os.getenv("LIDARR_SEARCH_FLUSH_SECONDS", 30))
+# Fetch all existing artists and albums up front instead of checking each one
+LIDARR_PRELOAD = os.getenv("LIDARR_PRELOAD", "true").lower() in ("true", "1", "yes")
+DATA_DIR = os.getenv("DATA_DIR", "data")
+# MusicBrainz ID -> Lidarr ID for artists and albums already in Lidarr; empty disables it
+LIDARR_ID_CACHE_FILE = os.getenv(
+    "LIDARR_ID_CACHE_FILE", os.path.join(DATA_DIR, "lidarr_ids.db")
+)
+
+
+class LidarrSettings:
+    """Where and how to sync: the Lidarr instance, profiles and concurrency.
+
+    Anything not given falls back to the environment configuration above. Holds
+    the pooled session used for every request made with these settings.
+    """
+
+    def __init__(
+        self,
+        url=None,
+        api_key=None,
+        root_folder_path=None,
+        quality_profile_id=None,
+        metadata_profile_id=None,
+        max_in_flight=None,
+    ):
+        self.url = url or LIDARR_URL
+        self.api_key = api_key or API_KEY
+        self.root_folder_path = root_folder_path or ROOT_FOLDER_PATH
+        self.quality_profile_id = int(quality_profile_id or QUALITY_PROFILE_ID)
+        self.metadata_profile_id = int(metadata_profile_id or METADATA_PROFILE_ID)
+        self.max_in_flight = int(max_in_flight or LIDARR_MAX_IN_FLIGHT)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The pooled Lidarr session, keeping connections alive between calls."""
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                session.headers.update({"X-Api-Key": self.api_key})
+                # One pooled connection per album in flight
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.max_in_flight
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+        return self._session
 
 
 def safe_get_first(data):
@@ -26,11 +84,128 @@ def safe_get_first(data):
     return data
 
 
-def get_album_by_releasegroup(mb_release_group_id):
+class LidarrIdCache:
+    """SQLite map of MusicBrainz IDs to the Lidarr IDs they were added under.
+
+    Only used when the Lidarr library isn't preloaded (LIDARR_PRELOAD off, or
+    the preload failed), in place of per-item lookups; a preload is already
+    Lidarr's current state. Entries are per Lidarr instance (keyed by its URL).
+    An entry can go stale if the item is deleted in Lidarr, so callers forget
+    it when Lidarr disagrees. Safe to share between threads.
+    """
+
+    def __init__(self, path, instance):
+        self.instance = instance
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS lidarr_id (
+                    instance TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    mb_id TEXT NOT NULL,
+                    lidarr_id INTEGER NOT NULL,
+                    PRIMARY KEY (instance, kind, mb_id)
+                )
+                """)
+
+    def get(self, kind, mb_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lidarr_id FROM lidarr_id WHERE instance = ? AND kind = ? AND mb_id = ?",
+                (self.instance, kind, mb_id),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, kind, mb_id, lidarr_id):
+        if not lidarr_id:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lidarr_id (instance, kind, mb_id, lidarr_id) VALUES (?, ?, ?, ?)",
+                (self.instance, kind, mb_id, lidarr_id),
+            )
+
+    def forget(self, kind, mb_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM lidarr_id WHERE instance = ? AND kind = ? AND mb_id = ?",
+                (self.instance, kind, mb_id),
+            )
+
+
+_id_caches = {}
+_id_cache_lock = threading.Lock()
+
+
+def get_id_cache(instance):
+    """Return the ID cache for a Lidarr URL, or None if LIDARR_ID_CACHE_FILE is empty."""
+    if not LIDARR_ID_CACHE_FILE:
+        return None
+    with _id_cache_lock:
+        if instance not in _id_caches:
+            _id_caches[instance] = LidarrIdCache(LIDARR_ID_CACHE_FILE, instance)
+        return _id_caches[instance]
+
+
+class LidarrLibrary:
+    """Artists and albums already in Lidarr, loaded in bulk before a sync.
+
+    Maps foreignArtistId to the Lidarr artist ID and foreignAlbumId (the
+    release group MBID) to the full album resource, so existing entries need
+    no per-item lookup.
+    """
+
+    def __init__(self, artists, albums):
+        self.artist_ids = {
+            a["foreignArtistId"]: a["id"] for a in artists if a.get("foreignArtistId")
+        }
+        self.albums = {
+            a["foreignAlbumId"]: a for a in albums if a.get("foreignAlbumId")
+        }
+
+    @classmethod
+    def preload(cls, settings):
+        """Fetch every artist and album with two requests; None if Lidarr won't list them."""
+        try:
+            artists = settings.session.get(
+                f"{settings.url}/artist", timeout=REQUEST_TIMEOUT
+            )
+            albums = settings.session.get(
+                f"{settings.url}/album", timeout=REQUEST_TIMEOUT
+            )
+            if artists.status_code == 200 and albums.status_code == 200:
+                return cls(artists.json(), albums.json())
+            print(
+                f"  ✗ Library preload failed ({artists.status_code}/{albums.status_code})"
+            )
+        except Exception as e:
+            print(f"  ✗ Library preload failed: {e}")
+        return None
+
+
+def get_album_by_id(settings, album_id):
+    """Fetch an album Lidarr already has; a local read, unlike the metadata lookups."""
+    try:
+        r = settings.session.get(
+            f"{settings.url}/album/{album_id}", timeout=REQUEST_TIMEOUT
+        )
+        if r.status_code == 200:
+            return r.json() or None
+    except Exception:
+        # The caller falls back to the metadata lookup, so there's nothing to report
+        pass
+    return None
+
+
+def get_album_by_releasegroup(settings, mb_release_group_id):
     term_value = "lidarr:" + str(mb_release_group_id)
     params = {"term": term_value}
     try:
-        r = requests.get(f"{LIDARR_URL}/album/lookup", headers=HEADERS, params=params)
+        r = settings.session.get(
+            f"{settings.url}/album/lookup", params=params, timeout=REQUEST_TIMEOUT
+        )
         if r.status_code == 200:
             data = r.json()
             return data if data else None
@@ -41,11 +216,13 @@ def get_album_by_releasegroup(mb_release_group_id):
     return None
 
 
-def get_artist_by_mb_id(artist_mb_id):
+def get_artist_by_mb_id(settings, artist_mb_id):
     term_value = "lidarr:" + str(artist_mb_id)
     params = {"term": term_value}
     try:
-        r = requests.get(f"{LIDARR_URL}/artist/lookup", headers=HEADERS, params=params)
+        r = settings.session.get(
+            f"{settings.url}/artist/lookup", params=params, timeout=REQUEST_TIMEOUT
+        )
         if r.status_code == 200:
             data = r.json()
             return data if data else None
@@ -56,50 +233,90 @@ def get_artist_by_mb_id(artist_mb_id):
     return None
 
 
-def add_artist(artist_mb_id):
-    resp = get_artist_by_mb_id(artist_mb_id)
-    if resp:
-        artist_data = safe_get_first(resp)
-        if artist_data and artist_data.get("id"):
-            return artist_data["id"]
-        else:
+def add_artist(settings, artist_mb_id):
+    """Find or add an artist. Returns (Lidarr artist ID or None, whether it was added now)."""
+    artist_data = safe_get_first(get_artist_by_mb_id(settings, artist_mb_id))
+    if not artist_data:
+        print(f"  ✗ No artist lookup response for {artist_mb_id}")
+        return None, False
+    if artist_data.get("id"):
+        return artist_data["id"], False
+
+    artist_data["metadataProfileId"] = settings.metadata_profile_id
+    artist_data["qualityProfileId"] = settings.quality_profile_id
+    artist_data["rootFolderPath"] = settings.root_folder_path
+    try:
+        add = settings.session.post(
+            f"{settings.url}/artist", json=artist_data, timeout=REQUEST_TIMEOUT
+        )
+        if add.status_code in (200, 201):
+            print(f"  ✓ Added artist: {artist_data.get('artistName', artist_mb_id)}")
+            return add.json().get("id"), True
+        print(f"  ✗ Failed to add artist {artist_mb_id}")
+    except Exception as e:
+        print(f"  ✗ Exception adding artist {artist_mb_id}")
+    return None, False
+
+
+class ArtistRegistry:
+    """Resolves each artist once per sync, however many albums need it at the same time.
+
+    The first album worker to ask for an artist looks it up (adding it if
+    needed); workers asking for the same artist meanwhile wait for that result.
+    Artists in the preloaded library (or, without one, the ID cache) need no
+    request at all.
+    """
+
+    def __init__(self, settings, id_cache=None, library=None):
+        self.settings = settings
+        self.id_cache = id_cache
+        self.library = library
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, artist_mb_id):
+        """Return (Lidarr artist ID or None, whether this sync added it)."""
+        with self._lock:
+            future = self._futures.get(artist_mb_id)
+            owner = future is None
+            if owner:
+                future = self._futures[artist_mb_id] = Future()
+        if owner:
             try:
-                lookup = requests.get(
-                    f"{LIDARR_URL}/artist/lookup",
-                    headers=HEADERS,
-                    params={"term": "lidarr:" + str(artist_mb_id)},
-                )
-                if lookup.status_code == 200:
-                    artist_data = safe_get_first(lookup.json())
-                    if artist_data:
-                        artist_data["metadataProfileId"] = METADATA_PROFILE_ID
-                        artist_data["qualityProfileId"] = QUALITY_PROFILE_ID
-                        artist_data["rootFolderPath"] = ROOT_FOLDER_PATH
-
-                        add = requests.post(
-                            f"{LIDARR_URL}/artist", headers=HEADERS, json=artist_data
-                        )
-                        if add.status_code in (200, 201):
-                            artist_id = add.json().get("id")
-                            print(
-                                f"  ✓ Added artist: {artist_data.get('artistName', artist_mb_id)}"
-                            )
-                            time.sleep(2)  # Wait for Lidarr to register artist fully
-                            return artist_id
-                        else:
-                            print(f"  ✗ Failed to add artist {artist_mb_id}")
-                    else:
-                        print(f"  ✗ No artist data found for {artist_mb_id}")
-                else:
-                    print(f"  ✗ Artist lookup failed for {artist_mb_id}")
+                future.set_result(self._resolve(artist_mb_id))
             except Exception as e:
-                print(f"  ✗ Exception adding artist {artist_mb_id}")
-    else:
-        print(f"  ✗ No artist lookup response for {artist_mb_id}")
-    return None
+                future.set_exception(e)
+        return future.result()
+
+    def _resolve(self, artist_mb_id):
+        if self.library:
+            # The preload is Lidarr's current state, so a miss is an artist to
+            # add, even if the ID cache remembers one (it may have been deleted)
+            if artist_mb_id in self.library.artist_ids:
+                return self.library.artist_ids[artist_mb_id], False
+        elif self.id_cache:
+            artist_id = self.id_cache.get("artist", artist_mb_id)
+            if artist_id:
+                return artist_id, False
+        artist_id, added = add_artist(self.settings, artist_mb_id)
+        if self.id_cache:
+            self.id_cache.put("artist", artist_mb_id, artist_id)
+        return artist_id, added
+
+    def forget(self, artist_mb_id):
+        """Drop a cached artist ID that Lidarr rejected, so the next sync looks it up."""
+        if self.id_cache:
+            self.id_cache.forget("artist", artist_mb_id)
+
+    def resolved_count(self):
+        with self._lock:
+            futures = list(self._futures.values())
+        return sum(
+            1 for f in futures if f.done() and not f.exception() and f.result()[0]
+        )
 
 
-def monitor_album_if_needed(album):
+def monitor_album_if_needed(settings, album):
     album_id = album.get("id")
     if album_id is None:
         return False
@@ -109,8 +326,8 @@ def monitor_album_if_needed(album):
 
     album["monitored"] = True
     try:
-        resp = requests.put(
-            f"{LIDARR_URL}/album/{album_id}", headers=HEADERS, json=album
+        resp = settings.session.put(
+            f"{settings.url}/album/{album_id}", json=album, timeout=REQUEST_TIMEOUT
         )
         if resp.status_code in (200, 202):
             return True
@@ -120,20 +337,84 @@ def monitor_album_if_needed(album):
         return False
 
 
-def trigger_album_search(album_id, album_title):
+def trigger_album_search(settings, album_id, album_title):
+    """Queue an AlbumSearch for one album ID, or for a list of them."""
     if album_id is None:
         return
-    command_json = {"name": "AlbumSearch", "albumIds": [album_id]}
+    if isinstance(album_id, list):
+        album_ids, label = album_id, album_title
+    else:
+        album_ids, label = [album_id], f"'{album_title}'"
+    command_json = {"name": "AlbumSearch", "albumIds": album_ids}
     try:
-        resp = requests.post(
-            f"{LIDARR_URL}/command", headers=HEADERS, json=command_json
+        resp = settings.session.post(
+            f"{settings.url}/command", json=command_json, timeout=REQUEST_TIMEOUT
         )
         if resp.status_code in (200, 201):
-            print(f"  → Search triggered for '{album_title}'")
+            print(f"  → Search triggered for {label}")
         else:
-            print(f"  ✗ Search failed for '{album_title}'")
+            print(f"  ✗ Search failed for {label}")
     except Exception as e:
-        print(f"  ✗ Search exception for '{album_title}'")
+        print(f"  ✗ Search exception for {label}")
+
+
+class SearchBatcher:
+    """Collects albums to search for and sends them as few AlbumSearch commands.
+
+    A batch is sent once it holds `chunk_size` albums or its oldest album has
+    waited `flush_interval` seconds; close() sends whatever is left.
+    """
+
+    def __init__(self, settings, chunk_size=None, flush_interval=None):
+        self.settings = settings
+        self.chunk_size = max(1, chunk_size or LIDARR_SEARCH_BATCH_SIZE)
+        self.flush_interval = (
+            LIDARR_SEARCH_FLUSH_SECONDS if flush_interval is None else flush_interval
+        )
+        self.commands_sent = 0
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, album_id, album_title):
+        if album_id is None:
+            return
+        with self._lock:
+            self._pending.append((album_id, album_title))
+            batch = self._take() if len(self._pending) >= self.chunk_size else None
+            if not batch and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._send(batch)
+
+    def flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._send(batch)
+
+    def close(self):
+        self.flush()
+
+    def _take(self):
+        batch, self._pending = self._pending, []
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _send(self, batch):
+        if len(batch) == 1:
+            trigger_album_search(self.settings, *batch[0])
+        else:
+            trigger_album_search(
+                self.settings,
+                [album_id for album_id, _ in batch],
+                f"{len(batch)} albums",
+            )
+        self.commands_sent += 1
 
 
 def extract_artist_mb_id(album_info):
@@ -148,134 +429,190 @@ def extract_artist_mb_id(album_info):
     return artist_mb_id
 
 
-def first_pass_add_artists(groups):
-    """Add all unique artists from albums upfront. Return mapping of MBID to Lidarr artist ID."""
-    artist_map = {}
-    processed_artist_mbids = set()
-
-    print(f"🎵 PASS 1: Adding artists")
-    for i, entry in enumerate(groups):
-        mb_id = entry.get("MusicBrainzId")
-        if not mb_id:
-            continue
-
-        print(f"  Processing artist {i + 1}/{len(groups)}: {mb_id}")
-        album_info = get_album_by_releasegroup(mb_id)
-        album_info = safe_get_first(album_info)
-        if not album_info:
-            print(f"  ✗ Lookup failed for album {mb_id}")
-            continue
-
-        artist_mb_id = extract_artist_mb_id(album_info)
-        if not artist_mb_id:
-            print(f"  ✗ No artist MBID found for album {mb_id}")
-            continue
-
-        if artist_mb_id in processed_artist_mbids:
-            print(f"  ⚬ Artist already processed: {artist_mb_id}")
-            continue
-
-        artist_id = add_artist(artist_mb_id)
-        if artist_id:
-            artist_map[artist_mb_id] = artist_id
-        processed_artist_mbids.add(artist_mb_id)
-
-    print(f"✅ PASS 1 Complete: {len(artist_map)} artists added/found")
-    return artist_map
-
-
-def second_pass_add_albums(groups, artist_map):
-    print(f"💿 PASS 2: Adding albums")
-    success_count = 0
-    fail_count = 0
-    existing_count = 0
-
-    for i, entry in enumerate(groups):
-        mb_id = entry.get("MusicBrainzId")
-        if not mb_id:
-            continue
-
-        print(f"Processing album {i + 1}/{len(groups)}: {mb_id}")
-        album_info = get_album_by_releasegroup(mb_id)
-        album_info = safe_get_first(album_info)
-        if not album_info:
-            print(f"  ✗ Lookup failed for album {mb_id}")
-            fail_count += 1
-            continue
-
-        artist_mb_id = extract_artist_mb_id(album_info)
-        if not artist_mb_id or artist_mb_id not in artist_map:
-            print(f"  ✗ Artist MBID missing in artist map for album {mb_id}")
-            fail_count += 1
-            continue
-
-        artist_id = artist_map[artist_mb_id]
-
-        # Check if album already exists
-        if album_info.get("id"):
-            print(f"  ⚬ Already exists: {album_info.get('title')}")
-            existing_count += 1
-            # Ensure monitored and trigger search
-            monitored = monitor_album_if_needed(album_info)
-            if monitored:
-                trigger_album_search(album_info.get("id"), album_info.get("title"))
-            continue
-
-        # Prepare album info to add
-        album_body = album_info
-        album_body["artistId"] = artist_id
-        album_body["metadataProfileId"] = METADATA_PROFILE_ID
-        album_body["qualityProfileId"] = QUALITY_PROFILE_ID
-        album_body["monitored"] = True
-        album_body["addOptions"] = {"searchForMissingAlbums": True}
+def sync_existing_album(
+    settings, album_info, mb_id, position, total, id_cache, searches
+):
+    if id_cache:
+        id_cache.put("album", mb_id, album_info["id"])
+    print(f"  ⚬ [{position}/{total}] Already exists: {album_info.get('title')}")
+    # Ensure monitored and trigger search
+    if monitor_album_if_needed(settings, album_info):
+        searches.add(album_info.get("id"), album_info.get("title"))
+    return "existing"
+
+
+def sync_album(settings, mb_id, position, total, artists, searches):
+    """Add one release group to Lidarr, adding its artist first if needed.
+
+    Returns "added", "existing" or "failed".
+    """
+    id_cache = artists.id_cache
+    album_info = None
+    if artists.library:
+        # The preload is the current state, so albums missing from it are new
+        album_info = artists.library.albums.get(mb_id)
+    elif id_cache:
+        cached_id = id_cache.get("album", mb_id)
+        if cached_id:
+            album_info = get_album_by_id(settings, cached_id)
+            if not album_info:
+                id_cache.forget("album", mb_id)
+    if not album_info:
+        album_info = safe_get_first(get_album_by_releasegroup(settings, mb_id))
+    if not album_info:
+        print(f"  ✗ [{position}/{total}] Lookup failed for album {mb_id}")
+        return "failed"
+
+    if album_info.get("id"):
+        return sync_existing_album(
+            settings, album_info, mb_id, position, total, id_cache, searches
+        )
 
-        try:
-            add_resp = requests.post(
-                f"{LIDARR_URL}/album", headers=HEADERS, json=album_body
-            )
-            if add_resp.status_code in (200, 201):
-                album_id = add_resp.json().get("id")
-                print(f"  ✓ Added: {album_info.get('title')}")
-                success_count += 1
-                trigger_album_search(album_id, album_info.get("title"))
-            else:
-                print(f"  ✗ Add failed for {mb_id}")
-                fail_count += 1
-        except Exception as e:
-            print(f"  ✗ Exception adding album {mb_id}")
-            fail_count += 1
-        time.sleep(REQUEST_DELAY)
+    artist_mb_id = extract_artist_mb_id(album_info)
+    if not artist_mb_id:
+        print(f"  ✗ [{position}/{total}] No artist MBID found for album {mb_id}")
+        return "failed"
+
+    artist_id, artist_added = artists.resolve(artist_mb_id)
+    if not artist_id:
+        print(f"  ✗ [{position}/{total}] Artist unavailable for album {mb_id}")
+        return "failed"
+
+    if artist_added:
+        # Adding the artist may have added this album too; look again for its current state
+        album_info = (
+            safe_get_first(get_album_by_releasegroup(settings, mb_id)) or album_info
+        )
+
+    # Check if album already exists
+    if album_info.get("id"):
+        return sync_existing_album(
+            settings, album_info, mb_id, position, total, id_cache, searches
+        )
+
+    # Prepare album info to add
+    album_body = album_info
+    album_body["artistId"] = artist_id
+    album_body["metadataProfileId"] = settings.metadata_profile_id
+    album_body["qualityProfileId"] = settings.quality_profile_id
+    album_body["monitored"] = True
+    album_body["addOptions"] = {"searchForMissingAlbums": True}
 
+    try:
+        add_resp = settings.session.post(
+            f"{settings.url}/album", json=album_body, timeout=REQUEST_TIMEOUT
+        )
+        if add_resp.status_code in (200, 201):
+            album_id = add_resp.json().get("id")
+            if id_cache:
+                id_cache.put("album", mb_id, album_id)
+            print(f"  ✓ [{position}/{total}] Added: {album_info.get('title')}")
+            searches.add(album_id, album_info.get("title"))
+            return "added"
+        print(f"  ✗ [{position}/{total}] Add failed for {mb_id}")
+        if not artist_added:
+            # The artist ID may have come from a stale cache entry
+            artists.forget(artist_mb_id)
+    except Exception as e:
+        print(f"  ✗ [{position}/{total}] Exception adding album {mb_id}")
+    return "failed"
+
+
+def sync_release_groups(groups, settings=None, on_progress=None):
+    """Add every release group to Lidarr, up to `settings.max_in_flight` albums at a time.
+
+    Each album goes lookup -> artist -> add on its own worker, so album adds
+    start as soon as their artist is resolved rather than after every artist.
+    Existing artists and albums come from one bulk preload (LIDARR_PRELOAD), so
+    they need no per-item lookup. Without it, IDs cached from earlier runs
+    replace metadata lookups with local reads.
+    Searches for added and existing albums are batched into few AlbumSearch
+    commands by a SearchBatcher.
+    Returns counts of albums added, existing and failed, artists resolved and
+    search commands sent. `on_progress(done, total, counts)` is called after
+    each album finishes, with the running counts.
+    """
+    settings = settings or LidarrSettings()
+    # Each release group is synced once per run, even if listed more than once
+    mb_ids = list(
+        dict.fromkeys(
+            entry.get("MusicBrainzId") for entry in groups if entry.get("MusicBrainzId")
+        )
+    )
+    library = None
+    if LIDARR_PRELOAD:
+        print("📚 Loading existing Lidarr artists and albums...")
+        library = LidarrLibrary.preload(settings)
+        if library:
+            print(
+                f"  {len(library.artist_ids)} artists, {len(library.albums)} albums in Lidarr"
+            )
+    # The ID cache is only the fallback for when there is no preload; with one it
+    # would just be written and never read
+    id_cache = get_id_cache(settings.url) if library is None else None
+    artists = ArtistRegistry(settings, id_cache, library)
+    searches = SearchBatcher(settings)
+    counts = {"added": 0, "existing": 0, "failed": 0}
+
+    total = len(mb_ids)
+    print(f"💿 Syncing {total} albums ({settings.max_in_flight} at a time)")
+    try:
+        with ThreadPoolExecutor(max_workers=settings.max_in_flight) as pool:
+            futures = [
+                pool.submit(
+                    sync_album, settings, mb_id, i + 1, total, artists, searches
+                )
+                for i, mb_id in enumerate(mb_ids)
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    counts[future.result()] += 1
+                except Exception as e:
+                    print(f"  ✗ Exception syncing album: {e}")
+                    counts["failed"] += 1
+                if on_progress:
+                    on_progress(done, total, counts)
+    finally:
+        # Send the last partial batch of searches
+        searches.close()
+
+    counts["artists"] = artists.resolved_count()
+    counts["search_commands"] = searches.commands_sent
     print(
-        f"✅ PASS 2 Complete: {success_count} added, {existing_count} existing, {fail_count} failed"
+        f"✅ Sync complete: {counts['added']} added, {counts['existing']} existing, "
+        f"{counts['failed']} failed ({counts['artists']} artists added/found, "
+        f"{counts['search_commands']} search commands)"
     )
+    return counts
 
 
-def test_lidarr_connection():
-    """Test if we can connect to Lidarr. Returns True if successful."""
-    if not LIDARR_URL:
-        print("ERROR: LIDARR_URL not configured")
-        return False
-    if not API_KEY:
-        print("ERROR: API_KEY not configured")
-        return False
+def lidarr_connection_error(settings):
+    """Check that Lidarr is configured and reachable. Returns an error message, or None."""
+    if not settings.url:
+        return "LIDARR_URL not configured"
+    if not settings.api_key:
+        return "API_KEY not configured"
 
     try:
-        r = requests.get(f"{LIDARR_URL}/system/status", headers=HEADERS, timeout=10)
+        r = settings.session.get(f"{settings.url}/system/status", timeout=10)
         if r.status_code == 200:
-            return True
-        else:
-            print(f"ERROR: Lidarr returned status {r.status_code}")
-            return False
+            return None
+        return f"Lidarr returned status {r.status_code}"
     except requests.exceptions.ConnectionError:
-        print(f"ERROR: Cannot connect to Lidarr at {LIDARR_URL}")
-        return False
+        return f"Cannot connect to Lidarr at {settings.url}"
     except requests.exceptions.Timeout:
-        print(f"ERROR: Connection to Lidarr timed out")
-        return False
+        return "Connection to Lidarr timed out"
     except Exception as e:
-        print(f"ERROR: Failed to connect to Lidarr: {e}")
+        return f"Failed to connect to Lidarr: {e}"
+
+
+def test_lidarr_connection(settings=None):
+    """Test if we can connect to Lidarr. Returns True if successful."""
+    error = lidarr_connection_error(settings or LidarrSettings())
+    if error:
+        print(f"ERROR: {error}")
         return False
+    return True
 
 
 def main():
@@ -284,8 +621,10 @@ def main():
     # Get input file from command line argument or use default
     input_file = sys.argv[1] if len(sys.argv) > 1 else RELEASEGROUPS_FILE
 
+    settings = LidarrSettings()
+
     # Check Lidarr connection first
-    if not test_lidarr_connection():
+    if not test_lidarr_connection(settings):
         sys.exit(1)
 
     print("Connected to Lidarr successfully")
@@ -299,10 +638,18 @@ def main():
 
     print(f"Loaded {len(groups)} MusicBrainz Release Group IDs.")
 
-    test_groups = groups
-
-    artist_map = first_pass_add_artists(test_groups)
-    second_pass_add_albums(test_groups, artist_map)
+    progress = ProgressReporter(
+        lambda state: print(
+            f"📈 {state.done}/{state.total} albums synced ({state.summary() or 'done'})"
+        ),
+        max_per_second=0.2,
+    )
+    sync_release_groups(
+        groups,
+        settings,
+        on_progress=lambda done, total, counts: progress.update(done, total),
+    )
+    progress.finish()
 
 
 if __name__ == "__main__":
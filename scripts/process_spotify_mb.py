@@ -1,17 +1,126 @@
 import csv
+import gzip
+import hashlib
 import json
+import lzma
+import os
 import re
-import subprocess
+import sqlite3
+import sys
+import tarfile
+import tempfile
+import threading
 import time
 import unicodedata
-import urllib.parse
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from progress_reporter import ProgressReporter
+from track_records import iter_tracks
 
 # Config: Set your input/output files and max albums to query
 INPUT_FILE = 'playlist_tracks.json'  # or 'playlist_tracks.csv'
 OUTPUT_FILE = 'lidarr_mb_releasegroups.json'
 FAILED_MATCHES_FILE = 'failed_matches.json'
+DATA_DIR = os.getenv('DATA_DIR', 'data')
 MAX_ALBUMS = 1000000  # Limit output to first 10 unique albums for testing
 
+# MusicBrainz allows 1 request/second per client; lookups run concurrently up to
+# MB_MAX_IN_FLIGHT so slow responses don't leave that budget unused
+MB_REQUESTS_PER_SECOND = float(os.getenv('MB_REQUESTS_PER_SECOND', 1.0))
+MB_MAX_IN_FLIGHT = int(os.getenv('MB_MAX_IN_FLIGHT', 4))
+# Albums OR-ed into one search request; set to 1 to look every album up on its own
+MB_BATCH_SIZE = int(os.getenv('MB_BATCH_SIZE', 20))
+# The search endpoint returns at most 100 results per request
+MB_SEARCH_LIMIT = 100
+
+MB_BASE_URL = os.getenv('MB_BASE_URL', 'https://musicbrainz.org/ws/2')
+MB_USER_AGENT = 'NavidromeImportTools/1.0 (https://github.com/ethanbarclay/navidrome-import-tools)'
+# Path to a CA bundle for HTTPS verification, or "false" to disable it (not recommended)
+MB_CA_BUNDLE = os.getenv('MB_CA_BUNDLE', '')
+
+# Persistent lookup cache; misses expire sooner since MusicBrainz keeps growing
+MB_CACHE_FILE = os.getenv('MB_CACHE_FILE', os.path.join(DATA_DIR, 'mb_cache.db'))
+MB_CACHE_TTL = int(os.getenv('MB_CACHE_TTL_DAYS', 90)) * 86400
+MB_CACHE_MISS_TTL = int(os.getenv('MB_CACHE_MISS_TTL_DAYS', 7)) * 86400
+
+# Local release-group store built from a MusicBrainz dump (--import-dump); used when the file exists
+MB_OFFLINE_DB = os.getenv('MB_OFFLINE_DB', os.path.join(DATA_DIR, 'mb_offline.db'))
+
+# Checkpoint journals for in-progress scans, so they can resume after a crash or restart
+MB_JOBS_DIR = os.path.join(DATA_DIR, 'mb_jobs')
+
+
+class MusicBrainzError(Exception):
+    """A MusicBrainz lookup failed (network, HTTP or parse error), as opposed to finding nothing."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may be sent."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve a token even if it isn't there yet, so waiters queue up in order
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold back every caller for the given time, e.g. when the server asks to back off."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+# Shared by every MusicBrainz request in the process (web tasks and CLI alike)
+mb_rate_limiter = TokenBucket(MB_REQUESTS_PER_SECOND)
+
+_mb_session = None
+_mb_session_lock = threading.Lock()
+
+
+def get_mb_session():
+    """Return the process-wide MusicBrainz session, keeping connections alive between lookups."""
+    global _mb_session
+    with _mb_session_lock:
+        if _mb_session is None:
+            session = requests.Session()
+            session.headers['User-Agent'] = MB_USER_AGENT
+            if MB_CA_BUNDLE.lower() == 'false':
+                session.verify = False
+            elif MB_CA_BUNDLE:
+                session.verify = MB_CA_BUNDLE
+            # One pooled connection per in-flight lookup
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MB_MAX_IN_FLIGHT)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _mb_session = session
+    return _mb_session
+
+
+def _retry_delay(response, attempt):
+    """Seconds to wait before retrying, honouring a numeric Retry-After header."""
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return 2 * (attempt + 1)
+
 # Function to clean and normalize strings for querying MusicBrainz
 def clean_string(s):
     if not s:
@@ -26,77 +135,367 @@ def clean_string(s):
     s = s.strip()
     return s
 
-# Function to query MusicBrainz release-group by artist and album title
-# Uses curl subprocess to work around Python SSL compatibility issues
-def query_mb_releasegroup(artist, album, max_retries=3):
+def _lucene_phrase(value):
+    """Quote a value as a Lucene phrase, escaping characters that would end it early."""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _releasegroup_clause(artist, album):
     query_parts = []
     if album:
-        query_parts.append(f'releasegroup:"{album}"')
+        query_parts.append(f'releasegroup:{_lucene_phrase(album)}')
     if artist:
-        query_parts.append(f'artist:"{artist}"')
-    query = ' AND '.join(query_parts)
-    if not query:
+        query_parts.append(f'artist:{_lucene_phrase(artist)}')
+    return ' AND '.join(query_parts)
+
+
+def _match_key(s):
+    """Loose form of a title or name for matching search results back to albums."""
+    s = ''.join(c for c in unicodedata.normalize('NFKD', s or '') if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^\w]+', ' ', s.casefold()).split())
+
+
+def _mb_search(query, limit, description, max_retries=3, raise_errors=False):
+    """Run one release-group search; returns the decoded response, or None on failure."""
+    def fail(message):
+        print(message)
+        if raise_errors:
+            raise MusicBrainzError(message)
         return None
 
-    # Build URL with query parameters
-    params = urllib.parse.urlencode({
+    params = {
         'query': query,
         'fmt': 'json',
-        'limit': 1
-    })
-    url = f'https://musicbrainz.org/ws/2/release-group/?{params}'
+        'limit': limit
+    }
+    url = f'{MB_BASE_URL}/release-group/'
+    session = get_mb_session()
 
     for attempt in range(max_retries):
+        mb_rate_limiter.acquire()
         try:
-            result = subprocess.run(
-                ['curl', '-s', '-H', 'User-Agent: NavidromeImportTools/1.0 (https://github.com/ethanbarclay/navidrome-import-tools)', url],
-                capture_output=True,
-                text=True,
-                timeout=15
-            )
-            if result.returncode != 0:
-                # SSL/connection error - wait and retry
+            response = session.get(url, params=params, timeout=15)
+            if response.status_code == 429 or response.status_code >= 500:
+                # Rate limited or server error - back off every lookup, not just this one, and retry
                 if attempt < max_retries - 1:
-                    time.sleep(2 * (attempt + 1))
+                    mb_rate_limiter.pause(_retry_delay(response, attempt))
                     continue
-                print(f"curl error for artist='{artist}', album='{album}': exit code {result.returncode}")
-                return None
-
-            data = json.loads(result.stdout)
-            if 'release-groups' in data and len(data['release-groups']) > 0:
-                return data['release-groups'][0]['id']
-            return None
-        except subprocess.TimeoutExpired:
+                return fail(f"HTTP {response.status_code} for {description}")
+            if response.status_code != 200:
+                return fail(f"HTTP {response.status_code} for {description}")
+            return response.json()
+        except requests.exceptions.Timeout:
             if attempt < max_retries - 1:
                 time.sleep(2 * (attempt + 1))
                 continue
-            print(f"Timeout querying MusicBrainz for artist='{artist}', album='{album}'")
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error for artist='{artist}', album='{album}': {e}")
-            return None
+            return fail(f"Timeout querying MusicBrainz for {description}")
+        except requests.exceptions.RequestException as e:
+            # SSL/connection error - wait and retry
+            if attempt < max_retries - 1:
+                time.sleep(2 * (attempt + 1))
+                continue
+            return fail(f"Connection error for {description}: {e}")
+        except ValueError as e:
+            return fail(f"JSON decode error for {description}: {e}")
         except Exception as e:
-            print(f"Error querying MusicBrainz for artist='{artist}', album='{album}': {e}")
-            return None
+            return fail(f"Error querying MusicBrainz for {description}: {e}")
     return None
 
+# Function to query MusicBrainz release-group by artist and album title
+# Uses a pooled keep-alive session; set MB_CA_BUNDLE if the system CA store causes SSL errors
+# With raise_errors=True, failed lookups raise MusicBrainzError instead of returning None
+def query_mb_releasegroup(artist, album, max_retries=3, raise_errors=False):
+    query = _releasegroup_clause(artist, album)
+    if not query:
+        return None
 
-if __name__ == "__main__":
-    # Read the playlist export file (JSON or CSV)
-    IS_JSON = INPUT_FILE.endswith('.json')
-    playlist_tracks = []
-    if IS_JSON:
-        with open(INPUT_FILE, encoding='utf-8') as f:
-            playlist_tracks = json.load(f)
-    else:
-        with open(INPUT_FILE, encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                playlist_tracks.append(row)
+    data = _mb_search(query, 1, f"artist='{artist}', album='{album}'", max_retries, raise_errors)
+    if data and data.get('release-groups'):
+        return data['release-groups'][0]['id']
+    return None
 
-    # Extract unique albums keyed by normalized (artist, album) using only first artist
-    albums = {}
-    track_to_album_map = {}  # Map each track to its album key for failed match tracking
 
+def query_mb_releasegroups(albums, max_retries=3, raise_errors=False):
+    """Look up several (artist, album) pairs with one OR-combined search.
+
+    Results are matched back to their albums locally, by title and credited
+    artist. Returns one release group ID per album, or None where the results
+    held no single exact match; those albums need a query of their own.
+    """
+    clauses = [_releasegroup_clause(artist, album) for artist, album in albums]
+    query = ' OR '.join(f'({clause})' for clause in clauses if clause)
+    if not query:
+        return [None] * len(albums)
+
+    data = _mb_search(query, MB_SEARCH_LIMIT, f"batch of {len(albums)} albums", max_retries, raise_errors)
+    candidates = {}
+    for group in (data or {}).get('release-groups', []):
+        artists = set()
+        for credit in group.get('artist-credit', []):
+            if not isinstance(credit, dict):
+                continue
+            artists.add(_match_key(credit.get('name')))
+            artists.add(_match_key((credit.get('artist') or {}).get('name')))
+        candidates.setdefault(_match_key(group.get('title')), []).append((artists, group['id']))
+
+    matches = []
+    for artist, album in albums:
+        artist_key = _match_key(artist)
+        ids = {
+            mb_id for artists, mb_id in candidates.get(_match_key(album), [])
+            if not artist_key or artist_key in artists
+        }
+        matches.append(ids.pop() if len(ids) == 1 else None)
+    return matches
+
+
+class MBLookupCache:
+    """SQLite cache of album -> release group lookups, keyed by the normalized query.
+
+    Misses are cached too (mb_id NULL) with a shorter TTL. Safe to share between threads.
+    """
+
+    def __init__(self, path, ttl=MB_CACHE_TTL, miss_ttl=MB_CACHE_MISS_TTL):
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS release_group_lookup (
+                    artist TEXT NOT NULL,
+                    album TEXT NOT NULL,
+                    mb_id TEXT,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (artist, album)
+                )
+            """)
+
+    @staticmethod
+    def _key(artist, album):
+        return ' '.join(artist.lower().split()), ' '.join(album.lower().split())
+
+    def get(self, artist, album):
+        """Return (found, mb_id); found is False when there is no fresh entry."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mb_id, fetched_at FROM release_group_lookup WHERE artist = ? AND album = ?",
+                self._key(artist, album)
+            ).fetchone()
+        if row is None:
+            return False, None
+        mb_id, fetched_at = row
+        ttl = self.ttl if mb_id else self.miss_ttl
+        if time.time() - fetched_at > ttl:
+            return False, None
+        return True, mb_id
+
+    def put(self, artist, album, mb_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO release_group_lookup (artist, album, mb_id, fetched_at) VALUES (?, ?, ?, ?)",
+                (*self._key(artist, album), mb_id, time.time())
+            )
+
+
+_mb_cache = None
+_mb_cache_lock = threading.Lock()
+
+
+def get_mb_cache():
+    """Return the process-wide lookup cache, or None if MB_CACHE_FILE is empty."""
+    global _mb_cache
+    with _mb_cache_lock:
+        if _mb_cache is None and MB_CACHE_FILE:
+            _mb_cache = MBLookupCache(MB_CACHE_FILE)
+    return _mb_cache
+
+
+# Preference among same-titled release groups by one artist (e.g. an album and its title single)
+RELEASE_GROUP_TYPE_RANK = {'album': 0, 'ep': 1, 'single': 2}
+UNKNOWN_TYPE_RANK = 3
+
+
+def _type_rank(primary_type):
+    return RELEASE_GROUP_TYPE_RANK.get((primary_type or '').lower(), UNKNOWN_TYPE_RANK)
+
+
+COPY_ESCAPES = {'t': '\t', 'n': '\n', 'r': '\r'}
+
+
+def _copy_field(field):
+    if field == '\\N':
+        return None
+    if '\\' not in field:
+        return field
+    return re.sub(r'\\(.)', lambda m: COPY_ESCAPES.get(m.group(1), m.group(1)), field)
+
+
+def _copy_rows(f):
+    """Rows of a PostgreSQL COPY text file, as found in the mbdump tarballs."""
+    for line in f:
+        yield [_copy_field(field) for field in line.rstrip('\n').split('\t')]
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.xz'):
+        return lzma.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def _json_dump_lines(path):
+    """Lines of a release-group JSON dump: a tarball holding mbdump/release-group, or plain/compressed JSON lines."""
+    if tarfile.is_tarfile(path):
+        with tarfile.open(path) as tar:
+            for member in tar:
+                if member.isfile() and member.name.endswith('mbdump/release-group'):
+                    with tar.extractfile(member) as f:
+                        for line in f:
+                            yield line.decode('utf-8')
+                    return
+        raise ValueError(f"No mbdump/release-group file in {path}")
+    with _open_text(path) as f:
+        yield from f
+
+
+class MBOfflineStore:
+    """Indexed SQLite store of release groups by normalized title and credited artist.
+
+    Built from a MusicBrainz dump with import_mb_dump(). Answers lookups
+    locally; None means "ask MusicBrainz", not "doesn't exist". Safe to share
+    between threads.
+    """
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def lookup(self, artist, album):
+        """Release group ID for an exact title and credited-artist match, or None if absent or ambiguous."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT mb_id, MIN(type_rank) AS rank FROM release_group_name "
+                "WHERE album = ? AND artist = ? GROUP BY mb_id ORDER BY rank LIMIT 2",
+                (_match_key(album), _match_key(artist))
+            ).fetchall()
+        if not rows or (len(rows) == 2 and rows[0][1] == rows[1][1]):
+            return None
+        return rows[0][0]
+
+
+def import_mb_dump(source, path=None):
+    """Build the offline store at `path` (MB_OFFLINE_DB) from a MusicBrainz dump.
+
+    `source` is either an extracted mbdump directory from the PostgreSQL data
+    dump (release_group, release_group_primary_type, artist_credit_name and
+    artist tables), or a release-group JSON dump: the release-group.tar.xz
+    tarball, or JSON lines in the same shape as search results. Returns the
+    number of release groups imported.
+    """
+    path = path or MB_OFFLINE_DB
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    # Our own temp file, so two imports into the same store can't write into each other's
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    os.close(fd)
+
+    conn = sqlite3.connect(temp_path)
+    conn.create_function('match_key', 1, _match_key, deterministic=True)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("CREATE TABLE release_group_name (album TEXT NOT NULL, artist TEXT NOT NULL, mb_id TEXT NOT NULL, type_rank INTEGER NOT NULL)")
+    try:
+        if os.path.isdir(source):
+            count = _import_postgres_dump(conn, source)
+        else:
+            count = _import_json_dump(conn, source)
+        conn.execute("CREATE INDEX release_group_name_lookup ON release_group_name (album, artist)")
+        conn.commit()
+    except BaseException:
+        conn.close()
+        os.remove(temp_path)
+        raise
+    conn.close()
+    os.replace(temp_path, path)
+    return count
+
+
+def _import_json_dump(conn, source):
+    def rows():
+        for line in _json_dump_lines(source):
+            if not line.strip():
+                continue
+            group = json.loads(line)
+            album = _match_key(group.get('title'))
+            rank = _type_rank(group.get('primary-type'))
+            names = set()
+            for credit in group.get('artist-credit', []):
+                if isinstance(credit, dict):
+                    names.add(_match_key(credit.get('name')))
+                    names.add(_match_key((credit.get('artist') or {}).get('name')))
+            for name in names:
+                if name:
+                    yield album, name, group['id'], rank
+            counter[0] += 1
+
+    counter = [0]
+    conn.executemany("INSERT INTO release_group_name VALUES (?, ?, ?, ?)", rows())
+    return counter[0]
+
+
+def _import_postgres_dump(conn, source):
+    # Stage the needed columns, then join and normalize in SQL
+    tables = {
+        'release_group': ('id INTEGER PRIMARY KEY, gid TEXT, name TEXT, artist_credit INTEGER, type INTEGER', (0, 1, 2, 3, 4)),
+        'release_group_primary_type': ('id INTEGER PRIMARY KEY, name TEXT', (0, 1)),
+        'artist_credit_name': ('artist_credit INTEGER, name TEXT, artist INTEGER', (0, 3, 2)),
+        'artist': ('id INTEGER PRIMARY KEY, name TEXT', (0, 2)),
+    }
+    for table, (columns, indexes) in tables.items():
+        conn.execute(f"CREATE TEMP TABLE {table} ({columns})")
+        placeholders = ', '.join('?' * len(indexes))
+        with _open_text(os.path.join(source, table)) as f:
+            conn.executemany(
+                f"INSERT INTO {table} VALUES ({placeholders})",
+                ([row[i] for i in indexes] for row in _copy_rows(f))
+            )
+    conn.execute("CREATE INDEX temp.artist_credit_name_credit ON artist_credit_name (artist_credit)")
+
+    ranks = ' '.join(f"WHEN '{name}' THEN {rank}" for name, rank in RELEASE_GROUP_TYPE_RANK.items())
+    conn.execute(f"""
+        INSERT INTO release_group_name
+        SELECT DISTINCT match_key(rg.name), match_key(credited.name), rg.gid,
+               CASE lower(rgt.name) {ranks} ELSE {UNKNOWN_TYPE_RANK} END
+        FROM release_group rg
+        JOIN (
+            SELECT acn.artist_credit, acn.name FROM artist_credit_name acn
+            UNION
+            SELECT acn.artist_credit, a.name FROM artist_credit_name acn JOIN artist a ON a.id = acn.artist
+        ) credited ON credited.artist_credit = rg.artist_credit
+        LEFT JOIN release_group_primary_type rgt ON rgt.id = rg.type
+    """)
+    return conn.execute("SELECT COUNT(*) FROM release_group").fetchone()[0]
+
+
+_mb_offline = None
+_mb_offline_lock = threading.Lock()
+
+
+def get_mb_offline():
+    """Return the process-wide offline store, or None if none has been imported."""
+    global _mb_offline
+    with _mb_offline_lock:
+        if _mb_offline is None and MB_OFFLINE_DB and os.path.exists(MB_OFFLINE_DB):
+            _mb_offline = MBOfflineStore(MB_OFFLINE_DB)
+    return _mb_offline
+
+
+def collect_albums(playlist_tracks):
+    """Group tracks into unique albums keyed by normalized (artist, album), using only the first artist."""
+    albums = {}
     for entry in playlist_tracks:
         artist_raw = entry.get('artist_name') or entry.get('artist') or ''
         album_raw = entry.get('album_name') or entry.get('album') or ''
@@ -117,46 +516,347 @@ if __name__ == "__main__":
 
         # Add this track to the album's track list
         albums[key]['tracks'].append(entry)
-        track_to_album_map[id(entry)] = key
+    return albums
 
-    # Query MusicBrainz for each unique album (up to MAX_ALBUMS)
-    result = []
-    failed_matches = []
-    count = 0
 
-    print(f"Found {len(albums)} unique albums. Querying MusicBrainz for up to {MAX_ALBUMS} albums...")
+class ScanJournal:
+    """Checkpoint journal for one MusicBrainz scan job, kept in MB_JOBS_DIR.
+
+    <job_id>.json holds the job definition (name and albums, tracks included,
+    so a resume doesn't need the original input file). <job_id>.jsonl gets one
+    line per answered album as soon as it resolves. The job id is derived from
+    the name and album keys, so re-running the same scan resumes it.
+    """
+
+    def __init__(self, job_id, name, albums, jobs_dir=None):
+        self.job_id = job_id
+        self.name = name
+        self.albums = albums
+        self.jobs_dir = jobs_dir or MB_JOBS_DIR
+        self._lock = threading.Lock()
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.jobs_dir, f"{self.job_id}.json")
+
+    @property
+    def log_path(self):
+        return os.path.join(self.jobs_dir, f"{self.job_id}.jsonl")
+
+    @classmethod
+    def create(cls, name, albums, jobs_dir=None):
+        """Start a journal for these albums, or pick up the existing one for the same job."""
+        digest = hashlib.sha1(name.encode('utf-8'))
+        for key in albums:
+            digest.update(json.dumps(key).encode('utf-8'))
+        journal = cls(digest.hexdigest()[:16], name, albums, jobs_dir)
+        if not os.path.exists(journal.meta_path):
+            os.makedirs(journal.jobs_dir, exist_ok=True)
+            meta = {
+                'job_id': journal.job_id,
+                'name': name,
+                'created_at': time.time(),
+                'albums': [{'key': list(key), **info} for key, info in albums.items()],
+            }
+            # A resume racing the original scan may write the same meta file; each
+            # writes its own temp file and the identical result is replaced atomically
+            fd, temp_path = tempfile.mkstemp(
+                prefix=f".{os.path.basename(journal.meta_path)}.", suffix='.tmp', dir=journal.jobs_dir
+            )
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f, ensure_ascii=False)
+                os.replace(temp_path, journal.meta_path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        return journal
+
+    @classmethod
+    def open(cls, job_id, jobs_dir=None):
+        """Load an unfinished job; raises FileNotFoundError if there is none."""
+        jobs_dir = jobs_dir or MB_JOBS_DIR
+        with open(os.path.join(jobs_dir, f"{os.path.basename(job_id)}.json"), encoding='utf-8') as f:
+            meta = json.load(f)
+        albums = {}
+        for entry in meta['albums']:
+            key = tuple(entry.pop('key'))
+            albums[key] = entry
+        return cls(meta['job_id'], meta['name'], albums, jobs_dir)
 
-    for (artist_key, album_key), info in albums.items():
-        # if count >= MAX_ALBUMS:
-        #     break
-        artist = info['artist']
-        album = info['album']
-        tracks = info['tracks']
-        print(f"Querying for Artist: '{artist}' | Album: '{album}'")
+    @classmethod
+    def list_jobs(cls, jobs_dir=None):
+        """Summaries of unfinished jobs, most recently active first."""
+        jobs_dir = jobs_dir or MB_JOBS_DIR
+        if not os.path.isdir(jobs_dir):
+            return []
+        jobs = []
+        for filename in os.listdir(jobs_dir):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                journal = cls.open(filename[:-len('.json')], jobs_dir)
+            except (OSError, ValueError, KeyError):
+                continue
+            log_path = journal.log_path
+            jobs.append({
+                'job_id': journal.job_id,
+                'name': journal.name,
+                'total': len(journal.albums),
+                'done': len(journal.resolved()),
+                'updated_at': os.path.getmtime(log_path if os.path.exists(log_path) else journal.meta_path),
+            })
+        return sorted(jobs, key=lambda job: job['updated_at'], reverse=True)
+
+    def resolved(self):
+        """Albums already answered by earlier runs, as {key: mb_id or None}."""
+        resolved = {}
+        if not os.path.exists(self.log_path):
+            return resolved
+        with open(self.log_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn final line from a crash mid-write
+                key = tuple(entry['key'])
+                if key in self.albums:
+                    resolved[key] = entry['mb_id']
+        return resolved
+
+    def record(self, key, mb_id):
+        line = json.dumps({'key': list(key), 'mb_id': mb_id}, ensure_ascii=False)
+        with self._lock, open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def remove(self):
+        """Delete the journal once the job's results have been written."""
+        for path in (self.log_path, self.meta_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
 
-        mb_id = query_mb_releasegroup(artist, album)
 
-        # Fallback: if no result and artist was used, try album only
+# Outcome of one album lookup; error is True when MusicBrainz couldn't be asked,
+# offline is True when the local dump store answered
+AlbumLookup = namedtuple('AlbumLookup', ['mb_id', 'cached', 'error', 'offline'], defaults=(False,))
+
+
+def local_lookup(artist, album):
+    """Answer a lookup from the cache or the offline store, or return None to go live."""
+    cache = get_mb_cache()
+    if cache:
+        found, mb_id = cache.get(artist, album)
+        if found:
+            return AlbumLookup(mb_id, True, False)
+
+    offline = get_mb_offline()
+    if offline:
+        mb_id = offline.lookup(artist, album)
+        if mb_id:
+            return AlbumLookup(mb_id, False, False, True)
+    return None
+
+
+def resolve_album(artist, album):
+    """Look up an album's release group ID, falling back to an album-only query.
+
+    Returns an AlbumLookup. The cache and offline store are tried first;
+    live answers, including "not found", go to the lookup cache, but lookups
+    that fail with an error are not cached.
+    """
+    lookup = local_lookup(artist, album)
+    if lookup:
+        return lookup
+
+    try:
+        mb_id = query_mb_releasegroup(artist, album, raise_errors=True)
         if not mb_id and artist:
-            print(f"  Fallback: retrying with album only (no artist)")
-            mb_id = query_mb_releasegroup('', album)
+            mb_id = query_mb_releasegroup('', album, raise_errors=True)
+    except MusicBrainzError:
+        return AlbumLookup(None, False, True)
+
+    cache = get_mb_cache()
+    if cache:
+        cache.put(artist, album, mb_id)
+    return AlbumLookup(mb_id, False, False)
 
+
+def resolve_album_batch(batch):
+    """Resolve a list of (key, info) albums with one batched search.
+
+    Returns (matched, leftover): (key, AlbumLookup) pairs for albums the search
+    answered unambiguously, and the keys still needing resolve_album(). If the
+    batched request fails, every album is left over.
+    """
+    try:
+        mb_ids = query_mb_releasegroups([(info['artist'], info['album']) for _, info in batch], raise_errors=True)
+    except MusicBrainzError:
+        return [], [key for key, _ in batch]
+
+    cache = get_mb_cache()
+    matched = []
+    leftover = []
+    for (key, info), mb_id in zip(batch, mb_ids):
         if mb_id:
-            print(f"  Found MusicBrainz Release Group ID: {mb_id}")
-            result.append({"MusicBrainzId": mb_id})
+            if cache:
+                cache.put(info['artist'], info['album'], mb_id)
+            matched.append((key, AlbumLookup(mb_id, False, False)))
         else:
-            print(f"  Could not find MusicBrainz ID for Album '{album}' by '{artist}'")
-            # Add failed match info with associated tracks
-            failed_match = {
-                "artist": artist,
-                "album": album,
-                "tracks": tracks
+            leftover.append(key)
+    return matched, leftover
+
+
+def resolve_albums(albums, max_in_flight=None, batch_size=None):
+    """Resolve albums concurrently under the shared rate limit.
+
+    `albums` maps keys to dicts with 'artist' and 'album'. Yields
+    (key, info, lookup) as each lookup completes, in completion order.
+
+    Albums not in the cache or offline store are searched `batch_size` at a time (MB_BATCH_SIZE by
+    default); albums a batch leaves ambiguous or unmatched are then looked up
+    one by one, so the answers match per-album resolution.
+    """
+    batch_size = MB_BATCH_SIZE if batch_size is None else batch_size
+    with ThreadPoolExecutor(max_workers=max_in_flight or MB_MAX_IN_FLIGHT) as pool:
+        if batch_size <= 1:
+            futures = {
+                pool.submit(resolve_album, info['artist'], info['album']): key
+                for key, info in albums.items()
             }
-            failed_matches.append(failed_match)
+            for future in as_completed(futures):
+                key = futures[future]
+                yield key, albums[key], future.result()
+            return
+
+        uncached = []
+        for key, info in albums.items():
+            lookup = local_lookup(info['artist'], info['album'])
+            if lookup:
+                yield key, info, lookup
+                continue
+            uncached.append((key, info))
+
+        # None marks a batch future; single lookups map to their album key
+        futures = {
+            pool.submit(resolve_album_batch, uncached[i:i + batch_size]): None
+            for i in range(0, len(uncached), batch_size)
+        }
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = futures.pop(future)
+                if key is not None:
+                    yield key, albums[key], future.result()
+                    continue
+                matched, leftover = future.result()
+                for matched_key, lookup in matched:
+                    yield matched_key, albums[matched_key], lookup
+                for leftover_key in leftover:
+                    info = albums[leftover_key]
+                    futures[pool.submit(resolve_album, info['artist'], info['album'])] = leftover_key
+
+
+def scan_albums(albums, on_progress=None, max_in_flight=None, journal=None):
+    """Resolve every album and split them into found and failed lists.
+
+    Returns (result, failed_matches, stats); results keep the order of `albums`
+    and `stats` holds 'cache_hits', 'offline_hits', 'cache_misses' and 'resumed'
+    counts, where misses are the albums that went to MusicBrainz.
+    `on_progress(done, total, info, mb_id, stats)` is called after each lookup
+    completes, with the running counts.
+
+    With a ScanJournal, albums it already answered are skipped and each new
+    answer is checkpointed; lookups that errored are left for the next run.
+    """
+    resolved = journal.resolved() if journal else {}
+    pending = {key: info for key, info in albums.items() if key not in resolved}
+    stats = {'cache_hits': 0, 'offline_hits': 0, 'cache_misses': 0, 'resumed': len(resolved)}
+    for key, info, lookup in resolve_albums(pending, max_in_flight):
+        resolved[key] = lookup.mb_id
+        if lookup.cached:
+            stats['cache_hits'] += 1
+        elif lookup.offline:
+            stats['offline_hits'] += 1
+        else:
+            stats['cache_misses'] += 1
+        if journal and not lookup.error:
+            journal.record(key, lookup.mb_id)
+        if on_progress:
+            on_progress(len(resolved), len(albums), info, lookup.mb_id, stats)
+
+    result = []
+    failed_matches = []
+    for key, info in albums.items():
+        mb_id = resolved[key]
+        if mb_id:
+            result.append({"MusicBrainzId": mb_id, "artist": info['artist'], "album": info['album']})
+        else:
+            failed_matches.append({"artist": info['artist'], "album": info['album'], "tracks": info['tracks']})
+    return result, failed_matches, stats
+
+
+if __name__ == "__main__":
+    if '--import-dump' in sys.argv:
+        # Build the offline store from a MusicBrainz dump, then exit
+        dump_path = sys.argv[sys.argv.index('--import-dump') + 1]
+        started = time.time()
+        count = import_mb_dump(dump_path)
+        print(f"Imported {count} release groups into '{MB_OFFLINE_DB}' in {time.time() - started:.0f}s")
+        sys.exit(0)
+
+    if '--list-jobs' in sys.argv:
+        for job in ScanJournal.list_jobs():
+            print(f"{job['job_id']}  {job['name']}  {job['done']}/{job['total']} albums")
+        sys.exit(0)
 
-        count += 1
-        # Respect MusicBrainz API rate limit — max 1 request per second
-        time.sleep(1.1)
+    if '--resume' in sys.argv:
+        # Resume an interrupted scan from its journal; the input file isn't needed
+        journal = ScanJournal.open(sys.argv[sys.argv.index('--resume') + 1])
+        albums = journal.albums
+    else:
+        # Read the playlist export file (JSON, NDJSON or CSV)
+        IS_JSON = INPUT_FILE.endswith(('.json', '.ndjson'))
+        playlist_tracks = []
+        if IS_JSON:
+            # Read lazily; collect_albums() groups the tracks as they come
+            playlist_tracks = iter_tracks(INPUT_FILE)
+        else:
+            with open(INPUT_FILE, encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    playlist_tracks.append(row)
+
+        # Extract unique albums keyed by normalized (artist, album) using only first artist
+        albums = collect_albums(playlist_tracks)
+        # Re-running the same input picks up where an interrupted run stopped
+        journal = ScanJournal.create(os.path.basename(INPUT_FILE), albums)
+
+    print(f"Found {len(albums)} unique albums. Querying MusicBrainz for up to {MAX_ALBUMS} albums...")
+    print(f"Scan job {journal.job_id} (resume with --resume {journal.job_id})")
+
+    def show_progress(state):
+        info, mb_id, stats = state.details['info'], state.details['mb_id'], state.details['stats']
+        latest = f"found {mb_id}" if mb_id else "not found"
+        print(f"[{state.done}/{state.total}] '{info['album']}' by '{info['artist']}': {latest} "
+              f"({stats['cache_hits']} cached, {stats['offline_hits']} offline, {stats['cache_misses']} looked up"
+              f"{', ' + state.summary() if state.summary() and not state.final else ''})")
+
+    # A few lines a second at most; unmatched albums are all listed in the failed-matches file
+    progress = ProgressReporter(show_progress, initial=len(journal.resolved()))
+
+    def print_progress(done, total, info, mb_id, stats):
+        progress.update(done, total, info=info, mb_id=mb_id, stats=stats)
+
+    # Lookups run concurrently; the shared token bucket keeps us within the MusicBrainz rate limit
+    found, failed_matches, stats = scan_albums(albums, on_progress=print_progress, journal=journal)
+    progress.finish()
+    print(f"Cache: {stats['cache_hits']} hits, {stats['offline_hits']} offline, {stats['cache_misses']} misses, "
+          f"{stats['resumed']} resumed from journal")
+    result = [{"MusicBrainzId": entry["MusicBrainzId"]} for entry in found]
 
     # Write the results to JSON file formatted for Lidarr
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
@@ -166,5 +866,7 @@ if __name__ == "__main__":
     with open(FAILED_MATCHES_FILE, 'w', encoding='utf-8') as f:
         json.dump(failed_matches, f, indent=2, ensure_ascii=False)
 
+    journal.remove()
+
     print(f"Exported {len(result)} MusicBrainz Release Group IDs to '{OUTPUT_FILE}'")
     print(f"Exported {len(failed_matches)} failed matches to '{FAILED_MATCHES_FILE}'")
@@ -0,0 +1,135 @@
+"""Throttled progress reporting with throughput and ETA.
+
+Fetching, scanning and matching call their progress callback for every page,
+album or track. ProgressReporter sits in between and passes on at most
+PROGRESS_MAX_PER_SECOND updates, always including the first and the final one,
+each with the latest counts, items per second and estimated time left.
+"""
+import os
+import threading
+import time
+
+# Most progress updates passed on per second, per job
+PROGRESS_MAX_PER_SECOND = float(os.getenv('PROGRESS_MAX_PER_SECOND', 4))
+
+
+def format_duration(seconds):
+    """'45s', '3m 05s' or '1h 02m'."""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+
+class ProgressState:
+    """One progress update: counts so far, throughput and ETA, plus the caller's details."""
+
+    def __init__(self, done, total, elapsed, rate, details, final):
+        self.done = done
+        self.total = total
+        self.elapsed = elapsed
+        # Items per second since the reporter started; None until something is done
+        self.rate = rate
+        self.details = details
+        self.final = final
+
+    @property
+    def fraction(self):
+        if not self.total:
+            return 1.0 if self.final else 0.0
+        return min(1.0, self.done / self.total)
+
+    @property
+    def eta(self):
+        """Seconds left at the current rate, or None when unknown."""
+        if self.final:
+            return 0
+        if not self.rate or not self.total:
+            return None
+        return max(0, self.total - self.done) / self.rate
+
+    def summary(self):
+        """'12.5/s, about 40s left' (or just the rate once finished)."""
+        if not self.rate:
+            return ''
+        text = f"{self.rate:.1f}/s"
+        if self.eta is not None and self.eta >= 1:
+            text += f", about {format_duration(self.eta)} left"
+        return text
+
+    def as_dict(self):
+        return {
+            'done': self.done,
+            'total': self.total,
+            'elapsed': round(self.elapsed, 1),
+            'rate': round(self.rate, 2) if self.rate else None,
+            'eta': round(self.eta) if self.eta is not None else None,
+        }
+
+
+class ProgressReporter:
+    """Coalesces frequent progress updates into at most `max_per_second` reports.
+
+    `report(state)` gets a ProgressState. update() may be called from several
+    threads; updates that arrive too soon after the last report are dropped,
+    but the next report carries their counts, and the final one (done reaching
+    total, or finish()) is always passed on. Call finish() once the work is
+    over, so the last update is reported even when done never reached total
+    (skipped items, an unknown total). `initial` is work already done before
+    this run (e.g. a resumed scan), left out of the rate.
+    """
+
+    def __init__(self, report, total=None, max_per_second=None, initial=0):
+        self._report = report
+        self.total = total
+        self._initial = initial
+        self._min_interval = 1 / (max_per_second or PROGRESS_MAX_PER_SECOND)
+        self._started = time.monotonic()
+        self._last_report = None
+        # Latest update, reported or not, for finish()
+        self._done = None
+        self._details = {}
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def _state(self, done, details, final):
+        elapsed = time.monotonic() - self._started
+        rate = (done - self._initial) / elapsed if elapsed > 0 and done > self._initial else None
+        return ProgressState(done, self.total, elapsed, rate, details, final)
+
+    def update(self, done, total=None, **details):
+        """Record progress; reports it unless the last report was too recent."""
+        with self._lock:
+            if self._finished:
+                return
+            if total is not None:
+                self.total = total
+            self._done, self._details = done, details
+            final = self.total is not None and done >= self.total
+            now = time.monotonic()
+            if not final and self._last_report is not None and now - self._last_report < self._min_interval:
+                return
+            self._last_report = now
+            self._finished = final
+            # Reported under the lock so reports from several threads stay in order
+            self._report(self._state(done, details, final))
+
+    def finish(self, done=None, **details):
+        """Report the final state, unless update() already did.
+
+        Without arguments, that is the latest update's counts and details;
+        nothing is reported if there never was an update.
+        """
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+            if done is None:
+                done = self._done
+                if done is None:
+                    return
+            self._report(self._state(done, {**self._details, **details}, True))
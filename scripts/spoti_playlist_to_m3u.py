@@ -1,54 +1,403 @@
 #!/usr/bin/env python3
 import sqlite3
+import copy
 import json
+import math
+import mmap
 import os
+import pickle
+import struct
+import sys
+import tempfile
+import threading
+from array import array
 from collections import defaultdict
+from itertools import islice
+
+from progress_reporter import ProgressReporter
+from track_records import read_tracks
 
 # Path to your Navidrome SQLite database file
 DB_PATH = os.getenv('DATABASE_PATH', 'navidrome.db')
 OUTPUT_DIR = os.getenv('OUTPUT_DIR', '.')
+DATA_DIR = os.getenv('DATA_DIR', 'data')
+
+# Serialized library + indexes, reused until the Navidrome DB changes
+SNAPSHOT_FILE = os.path.join(DATA_DIR, 'library_snapshot.bin')
+SNAPSHOT_MAGIC = b'NDLIB'
+SNAPSHOT_VERSION = 3
+
+# In-memory track layout: 'dict' (NavidromeLibrary) or 'columnar' (ColumnarLibrary)
+LIBRARY_LAYOUT = os.getenv('LIBRARY_LAYOUT', 'dict')
+
+# media_file columns loaded into NavidromeLibrary, in _add_row() order
+MEDIA_FILE_COLUMNS = (
+    'id, path, title, artist, album_artist, album, duration, updated_at, created_at'
+)
+
+# Once removed/changed rows exceed this share of the library, rebuild instead
+# of patching; tombstones left by removals are only reclaimed by a rebuild
+REFRESH_REBUILD_RATIO = 0.5
+
+# Gram length for the fuzzy title index, and the candidate count at which we
+# stop intersecting posting lists and just verify the survivors directly
+NGRAM_SIZE = 3
+NGRAM_VERIFY_THRESHOLD = 64
+
+def title_grams(text):
+    """Return the set of character n-grams in a lowercased title."""
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+def artist_tokens(artist_lower):
+    """Split a lowercased Navidrome artist string on its '•' separator."""
+    if not artist_lower:
+        return []
+    tokens = (token.strip() for token in artist_lower.split('•'))
+    return [token for token in tokens if token]
+
+def _new_posting():
+    return array('I')
+
+def _intern(value):
+    return sys.intern(value) if value else value
+
+def db_file_markers(db_path):
+    """Size and mtime of the database file and its WAL; cheap enough to poll."""
+    markers = {}
+    # Writes can sit in the WAL without touching the main file, so stat both
+    for suffix in ('', '-wal'):
+        try:
+            stat = os.stat(db_path + suffix)
+        except OSError:
+            continue
+        markers[f'mtime{suffix}'] = stat.st_mtime_ns
+        markers[f'size{suffix}'] = stat.st_size
+    return markers
+
+def library_markers(conn, db_path=None):
+    """Cheap change markers for media_file; any difference invalidates a snapshot."""
+    db_path = db_path or DB_PATH
+    max_updated_at, row_count = conn.execute(
+        "SELECT MAX(updated_at), COUNT(*) FROM media_file"
+    ).fetchone()
+    markers = {
+        'version': SNAPSHOT_VERSION,
+        'db_path': os.path.abspath(db_path),
+        'max_updated_at': max_updated_at,
+        'row_count': row_count,
+    }
+    markers.update(db_file_markers(db_path))
+    return markers
 
 class NavidromeLibrary:
-    """In-memory representation of Navidrome library for fast searching."""
+    """In-memory representation of Navidrome library for fast searching.
+    
+    Each track is a dict, and the title/artist indexes hold the dicts themselves.
+    See ColumnarLibrary for a lower-memory layout with the same search behaviour.
+    """
+    
+    layout = 'dict'
+    # Index attributes and the default their missing keys get. Snapshots store
+    # them as plain dicts, so the pickle never refers to a factory function
+    # (which, written by the CLI, would live in __main__ and not load elsewhere)
+    index_defaults = {'gram_index': _new_posting, 'title_index': list, 'artist_index': list}
+    # In a library made by patched(): index name -> keys whose bucket it has
+    # already copied; the other buckets are still shared with the original
+    _copied_buckets = None
     
     def __init__(self, conn):
         print("Loading library into memory...", flush=True)
-        cursor = conn.execute("""
-            SELECT id, path, title, artist, album_artist, album, duration
+        cursor = conn.execute(f"""
+            SELECT {MEDIA_FILE_COLUMNS}
             FROM media_file
         """)
         
+        # Trigram -> ascending positions in the library, used by the fuzzy fallback
+        self.gram_index = defaultdict(_new_posting)
+        # Track id -> position in the library; removed tracks leave a tombstone behind
+        self.positions = {}
+        self.removed_count = 0
+        # Latest updated_at/created_at seen, the starting point for refresh()
+        self.watermark = ''
+        self._init_storage()
+        
+        for row in cursor:
+            self._add_row(row)
+        
+        print(f"Loaded {len(self.positions)} tracks into memory", flush=True)
+    
+    # Storage layout: subclasses override these to change how tracks are held.
+    # A "handle" is whatever the title/artist indexes store for a track.
+    
+    def _init_storage(self):
         self.tracks = []
         self.title_index = defaultdict(list)
         self.artist_index = defaultdict(list)
+    
+    def _store_row(self, row):
+        """Store a media_file row and return its handle."""
+        track = {
+            'id': row[0],
+            'path': row[1],
+            'title': row[2],
+            'artist': row[3],
+            'album_artist': row[4],
+            'album': row[5],
+            'duration': row[6],
+            'title_lower': row[2].lower() if row[2] else '',
+            'artist_lower': row[3].lower() if row[3] else '',
+            'album_artist_lower': row[4].lower() if row[4] else '',
+        }
+        self.tracks.append(track)
+        return track
+    
+    def _clear_row(self, position):
+        self.tracks[position] = None
+    
+    def _copy_columns(self):
+        """Copy the storage that _clear_row() changes in place; appended-only storage stays shared."""
+        self.tracks = list(self.tracks)
+    
+    def _row_count(self):
+        """Number of stored rows, tombstones included."""
+        return len(self.tracks)
+    
+    def _handle(self, position):
+        """Handle for the row at position, or None if it was removed."""
+        return self.tracks[position]
+    
+    def _title_lower(self, track):
+        return track['title_lower']
+    
+    def _artist_lower(self, track):
+        return track['artist_lower']
+    
+    def _album_artist_lower(self, track):
+        return track['album_artist_lower']
+    
+    def _row_values(self, track):
+        """The stored media_file values (path through duration) for change detection."""
+        return (track['path'], track['title'], track['artist'],
+                track['album_artist'], track['album'], track['duration'])
+    
+    def _song(self, track):
+        """Turn a handle into the song dict returned by search_track()."""
+        return track
+    
+    def _without(self, bucket, track):
+        return [t for t in bucket if t is not track]
+    
+    # Indexing
+    
+    def _add_row(self, row):
+        """Append a media_file row and index it."""
+        position = self._row_count()
+        track = self._store_row(row)
+        self.positions[row[0]] = position
+        self.watermark = max(self.watermark, row[7] or '', row[8] or '')
         
-        for row in cursor:
-            track = {
-                'id': row[0],
-                'path': row[1],
-                'title': row[2],
-                'artist': row[3],
-                'album_artist': row[4],
-                'album': row[5],
-                'duration': row[6],
-                'title_lower': row[2].lower() if row[2] else '',
-                'artist_lower': row[3].lower() if row[3] else '',
-                'album_artist_lower': row[4].lower() if row[4] else '',
-            }
-            self.tracks.append(track)
-            
-            # Index by normalized title for fast lookup
-            if track['title_lower']:
-                self.title_index[track['title_lower']].append(track)
-            
-            # Index by artist tokens
-            if track['artist_lower']:
-                for token in track['artist_lower'].split('•'):
-                    token = token.strip()
-                    if token:
-                        self.artist_index[token].append(track)
+        # Index by normalized title for fast lookup
+        title_lower = self._title_lower(track)
+        if title_lower:
+            self._bucket('title_index', title_lower).append(track)
+            for gram in title_grams(title_lower):
+                self._bucket('gram_index', gram).append(position)
+        
+        # Index by artist tokens
+        for token in artist_tokens(self._artist_lower(track)):
+            self._bucket('artist_index', token).append(track)
+    
+    def _bucket(self, name, key):
+        """The bucket of index `name` for `key`, copied first if still shared with another library."""
+        index = getattr(self, name)
+        copied = self._copied_buckets
+        if copied is not None and key not in copied[name]:
+            copied[name].add(key)
+            if key in index:
+                index[key] = index[key][:]
+        return index[key]
+    
+    def _remove_track(self, track_id):
+        """Drop a track from the indexes, leaving a tombstone in its place."""
+        position = self.positions.pop(track_id)
+        track = self._handle(position)
+        title_lower = self._title_lower(track)
+        artist_lower = self._artist_lower(track)
+        self._clear_row(position)
+        self.removed_count += 1
         
-        print(f"Loaded {len(self.tracks)} tracks into memory", flush=True)
+        # Gram postings keep the stale position; candidates skip tombstones
+        if title_lower:
+            self._unindex(self.title_index, title_lower, track)
+        for token in artist_tokens(artist_lower):
+            self._unindex(self.artist_index, token, track)
+    
+    def _unindex(self, index, key, track):
+        # Replace rather than mutate the bucket so concurrent readers iterating it are unaffected
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        index[key] = self._without(bucket, track)
+        if not index[key]:
+            del index[key]
+    
+    def pending_changes(self, conn):
+        """Return (removed track ids, added/updated rows) since the last sync, without applying them.
+        
+        Returns None when the delta is large enough that a full reload is
+        cheaper; the caller should rebuild instead.
+        """
+        changed = conn.execute(f"""
+            SELECT {MEDIA_FILE_COLUMNS}
+            FROM media_file
+            WHERE updated_at >= ? OR created_at >= ?
+        """, (self.watermark, self.watermark)).fetchall()
+        current_ids = {row[0] for row in conn.execute("SELECT id FROM media_file")}
+        removed_ids = self.positions.keys() - current_ids
+        # Rows stamped exactly at the watermark come back every time
+        changed = [
+            row for row in changed
+            if row[0] not in self.positions
+            or row[1:7] != self._row_values(self._handle(self.positions[row[0]]))
+        ]
+        
+        stale_count = self.removed_count + len(removed_ids) + len(changed)
+        if stale_count > max(self._row_count(), 1) * REFRESH_REBUILD_RATIO:
+            return None
+        return removed_ids, changed
+    
+    def apply_changes(self, removed_ids, changed):
+        """Patch the library in place with the result of pending_changes()."""
+        for track_id in removed_ids:
+            self._remove_track(track_id)
+        for row in changed:
+            if row[0] in self.positions:
+                self._remove_track(row[0])
+            self._add_row(row)
+        
+        print(
+            f"Refreshed library: {len(changed)} added/updated, "
+            f"{len(removed_ids)} removed", flush=True
+        )
+    
+    def patched(self, removed_ids, changed):
+        """Return a new library with the result of pending_changes() applied; this one is left as is.
+        
+        The cost is proportional to the delta rather than the library: the
+        position map and index dicts are copied shallowly, buckets only when
+        a change touches them, and the track storage is shared except for
+        what removals overwrite, so readers of this library are unaffected.
+        """
+        library = copy.copy(self)
+        library.positions = dict(self.positions)
+        for name, default in self.index_defaults.items():
+            setattr(library, name, defaultdict(default, getattr(self, name)))
+        library._copy_columns()
+        library._copied_buckets = {name: set() for name in self.index_defaults}
+        library.apply_changes(removed_ids, changed)
+        library._copied_buckets = None
+        return library
+    
+    def refresh(self, conn):
+        """Patch the library in place with rows changed since the last sync.
+        
+        Returns False without changing anything when the delta is large enough
+        that a full reload is cheaper; the caller should rebuild instead.
+        """
+        changes = self.pending_changes(conn)
+        if changes is None:
+            return False
+        self.apply_changes(*changes)
+        return True
+    
+    @classmethod
+    def load(cls, conn, db_path=None, snapshot_path=None):
+        """Load the library from its on-disk snapshot, rebuilding it if stale.
+        
+        A stale snapshot of the same database is brought up to date with
+        refresh() rather than rebuilt from scratch.
+        """
+        snapshot_path = snapshot_path or SNAPSHOT_FILE
+        markers = cls.markers(conn, db_path)
+        
+        library, fresh = cls.from_snapshot(snapshot_path, markers)
+        if library is not None:
+            print(f"Loaded {len(library.positions)} tracks from snapshot", flush=True)
+            if fresh:
+                return library
+            if not library.refresh(conn):
+                library = None
+        
+        if library is None:
+            library = cls(conn)
+        library.save_snapshot(snapshot_path, markers)
+        return library
+    
+    @classmethod
+    def markers(cls, conn, db_path=None):
+        """library_markers() plus the storage layout the snapshot was written with."""
+        markers = library_markers(conn, db_path)
+        markers['layout'] = cls.layout
+        return markers
+    
+    @classmethod
+    def from_snapshot(cls, snapshot_path, markers):
+        """Return (library, fresh) from the snapshot, or (None, False) if unusable.
+        
+        The library is only unpickled when the snapshot matches the database
+        and format version; `fresh` says whether every change marker matched.
+        """
+        if not os.path.exists(snapshot_path):
+            return None, False
+        try:
+            with open(snapshot_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                header_end = len(SNAPSHOT_MAGIC) + 4
+                if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                    return None, False
+                (markers_len,) = struct.unpack('<I', mm[len(SNAPSHOT_MAGIC):header_end])
+                stored = json.loads(mm[header_end:header_end + markers_len])
+                if any(stored.get(key) != markers[key] for key in ('version', 'db_path', 'layout')):
+                    return None, False
+                with memoryview(mm) as view:
+                    state = pickle.loads(view[header_end + markers_len:])
+            library = cls.__new__(cls)
+            library.__dict__.update(state)
+            for name, default in cls.index_defaults.items():
+                setattr(library, name, defaultdict(default, state[name]))
+        except Exception as e:
+            # Truncated, corrupt or otherwise unloadable: rebuild as if stale
+            print(f"Ignoring unreadable library snapshot: {e}", flush=True)
+            return None, False
+        
+        return library, stored == markers
+    
+    def save_snapshot(self, snapshot_path, markers):
+        """Atomically write the library and its change markers to disk."""
+        encoded_markers = json.dumps(markers, sort_keys=True).encode('utf-8')
+        directory = os.path.dirname(snapshot_path) or '.'
+        temp_path = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # A temp file of our own, so the CLI and the web app can rebuild at the same time
+            fd, temp_path = tempfile.mkstemp(
+                prefix=f".{os.path.basename(snapshot_path)}.", suffix='.tmp', dir=directory
+            )
+            with os.fdopen(fd, 'wb') as f:
+                f.write(SNAPSHOT_MAGIC)
+                f.write(struct.pack('<I', len(encoded_markers)))
+                f.write(encoded_markers)
+                state = dict(self.__dict__)
+                for name in self.index_defaults:
+                    state[name] = dict(state[name])
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, snapshot_path)
+        except OSError as e:
+            print(f"Could not write library snapshot: {e}", flush=True)
+        finally:
+            # Left behind only if writing failed; after os.replace it is gone
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
     
     def search_track(self, track_name, artist_name):
         """Fast in-memory search for track."""
@@ -61,37 +410,228 @@ class NavidromeLibrary:
         if track_lower in self.title_index:
             for track in self.title_index[track_lower]:
                 if self._artist_matches(track, artist_lower, primary_artist):
-                    return track
+                    return self._song(track)
         
         # Strategy 2: Core title match (without feat. parts)
         if core_track != track_lower and core_track in self.title_index:
             for track in self.title_index[core_track]:
                 if self._artist_matches(track, artist_lower, primary_artist):
-                    return track
+                    return self._song(track)
         
         # Strategy 3: Fuzzy title match with artist check
-        for track in self.tracks:
-            if track_lower in track['title_lower'] or core_track in track['title_lower']:
+        for track in self._substring_candidates(track_lower, core_track):
+            if track is None:
+                continue
+            title_lower = self._title_lower(track)
+            if track_lower in title_lower or core_track in title_lower:
                 if self._artist_matches(track, artist_lower, primary_artist):
-                    return track
+                    return self._song(track)
         
         # Strategy 4: Artist-first search (check artist index then verify title)
         if primary_artist in self.artist_index:
             for track in self.artist_index[primary_artist]:
-                if track_lower in track['title_lower'] or core_track in track['title_lower']:
-                    return track
+                title_lower = self._title_lower(track)
+                if track_lower in title_lower or core_track in title_lower:
+                    return self._song(track)
         
         return None
     
+    def _substring_candidates(self, *needles):
+        """Yield tracks, in library order, whose title may contain any of the needles.
+        
+        A title can only contain a needle if it contains every n-gram of it, so
+        candidates come from intersecting the needle's posting lists. Needles too
+        short to have n-grams match almost anything; fall back to a full scan.
+        Removed tracks come through as None.
+        """
+        positions = set()
+        for needle in needles:
+            grams = title_grams(needle)
+            if not grams:
+                return (self._handle(i) for i in range(self._row_count()))
+            postings = sorted((self.gram_index.get(gram, ()) for gram in grams), key=len)
+            matches = set(postings[0])
+            for posting in postings[1:]:
+                if len(matches) <= NGRAM_VERIFY_THRESHOLD:
+                    break
+                matches.intersection_update(posting)
+            positions.update(matches)
+        return (self._handle(i) for i in sorted(positions))
+    
     def _artist_matches(self, track, artist_lower, primary_artist):
         """Check if track artist matches the search artist."""
+        track_artist = self._artist_lower(track)
+        album_artist = self._album_artist_lower(track)
         return (
-            artist_lower in track['artist_lower'] or
-            artist_lower in track['album_artist_lower'] or
-            primary_artist in track['artist_lower'] or
-            primary_artist in track['album_artist_lower']
+            artist_lower in track_artist or
+            artist_lower in album_artist or
+            primary_artist in track_artist or
+            primary_artist in album_artist
         )
 
+class ColumnarLibrary(NavidromeLibrary):
+    """NavidromeLibrary that stores tracks column-wise instead of as dicts.
+    
+    Handles are integer row ids, so the indexes are compact arrays. Names are
+    interned (artists and albums repeat heavily), paths are packed into a single
+    UTF-8 buffer, and lowercased fields are computed on demand for the few
+    candidates a search actually inspects. Song dicts are only built for matches.
+    """
+    
+    layout = 'columnar'
+    index_defaults = {'gram_index': _new_posting, 'title_index': _new_posting, 'artist_index': _new_posting}
+    
+    def _init_storage(self):
+        self.ids = []
+        self.titles = []
+        self.artists = []
+        self.album_artists = []
+        self.albums = []
+        self.durations = array('d')
+        self.path_data = bytearray()
+        self.path_offsets = array('Q', [0])
+        self.title_index = defaultdict(_new_posting)
+        self.artist_index = defaultdict(_new_posting)
+    
+    def _store_row(self, row):
+        position = len(self.ids)
+        self.ids.append(row[0])
+        self.titles.append(_intern(row[2]))
+        self.artists.append(_intern(row[3]))
+        self.album_artists.append(_intern(row[4]))
+        self.albums.append(_intern(row[5]))
+        self.durations.append(math.nan if row[6] is None else row[6])
+        self.path_data += (row[1] or '').encode('utf-8')
+        self.path_offsets.append(len(self.path_data))
+        return position
+    
+    def _clear_row(self, position):
+        # Column slots (and packed path bytes) stay allocated until the next rebuild
+        self.ids[position] = None
+    
+    def _copy_columns(self):
+        # Only ids is overwritten in place; the other columns are only appended to,
+        # past the rows an earlier library knows about
+        rows = len(self.ids)
+        self.ids = list(self.ids)
+        # Rows past ours can only come from a patch that failed part-way; no library uses them
+        for column in (self.titles, self.artists, self.album_artists, self.albums, self.durations):
+            del column[rows:]
+        del self.path_offsets[rows + 1:]
+        del self.path_data[self.path_offsets[-1]:]
+    
+    def _row_count(self):
+        return len(self.ids)
+    
+    def _handle(self, position):
+        return position if self.ids[position] is not None else None
+    
+    def _title_lower(self, row_id):
+        return (self.titles[row_id] or '').lower()
+    
+    def _artist_lower(self, row_id):
+        return (self.artists[row_id] or '').lower()
+    
+    def _album_artist_lower(self, row_id):
+        return (self.album_artists[row_id] or '').lower()
+    
+    def _path(self, row_id):
+        start, end = self.path_offsets[row_id], self.path_offsets[row_id + 1]
+        return self.path_data[start:end].decode('utf-8')
+    
+    def _row_values(self, row_id):
+        duration = self.durations[row_id]
+        return (self._path(row_id), self.titles[row_id], self.artists[row_id],
+                self.album_artists[row_id], self.albums[row_id],
+                None if math.isnan(duration) else duration)
+    
+    def _song(self, row_id):
+        path, title, artist, album_artist, album, duration = self._row_values(row_id)
+        return {
+            'id': self.ids[row_id],
+            'path': path,
+            'title': title,
+            'artist': artist,
+            'album_artist': album_artist,
+            'album': album,
+            'duration': duration,
+        }
+    
+    def _without(self, bucket, row_id):
+        return array('I', (i for i in bucket if i != row_id))
+
+def library_class(layout=None):
+    """Return the NavidromeLibrary class for a storage layout ('dict' or 'columnar')."""
+    layout = layout or LIBRARY_LAYOUT
+    for cls in (NavidromeLibrary, ColumnarLibrary):
+        if cls.layout == layout:
+            return cls
+    raise ValueError(f"Unknown library layout: {layout}")
+
+class SharedLibrary:
+    """Process-wide NavidromeLibrary shared by concurrent M3U jobs.
+    
+    Readers get the current library without locking. When the database files
+    change, the library is refreshed in the background: a patched library that
+    shares its unchanged parts with the current one (or, for large changes, a
+    rebuilt one) is swapped in, so jobs never wait on a refresh once the first
+    load has finished, and never search a library that is being changed.
+    """
+    
+    def __init__(self, db_path=None, snapshot_path=None, layout=None):
+        self.db_path = db_path or DB_PATH
+        self.snapshot_path = snapshot_path
+        self.library_class = library_class(layout)
+        self._library = None
+        self._file_markers = None
+        self._load_lock = threading.Lock()
+    
+    def get(self):
+        """Return the current library, loading it on first use."""
+        library = self._library
+        if library is None:
+            with self._load_lock:
+                if self._library is None:
+                    self._reload()
+                return self._library
+        
+        if db_file_markers(self.db_path) != self._file_markers:
+            # Only one refresh at a time; callers keep using the current copy
+            if self._load_lock.acquire(blocking=False):
+                threading.Thread(target=self._background_reload, daemon=True).start()
+        return library
+    
+    def _background_reload(self):
+        try:
+            self._reload()
+        except Exception as e:
+            print(f"Background library refresh failed: {e}", flush=True)
+        finally:
+            self._load_lock.release()
+    
+    def _reload(self):
+        # Take the markers first so a change during the load triggers another refresh
+        file_markers = db_file_markers(self.db_path)
+        conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+        try:
+            library = self._library
+            if library is None:
+                self._library = self.library_class.load(conn, self.db_path, self.snapshot_path)
+            else:
+                markers = self.library_class.markers(conn, self.db_path)
+                changes = library.pending_changes(conn)
+                if changes is None:
+                    library = self.library_class(conn)
+                elif any(changes):
+                    # Jobs may be searching the live library, so changes go into a new one
+                    library = library.patched(*changes)
+                if library is not self._library:
+                    library.save_snapshot(self.snapshot_path or SNAPSHOT_FILE, markers)
+                    self._library = library
+        finally:
+            conn.close()
+        self._file_markers = file_markers
+
 def navidrome_search_track_db(conn, track_name, artist_name):
     """Search Navidrome database for track by name and artist using SQL LIKE queries."""
     
@@ -177,42 +717,59 @@ def navidrome_search_track_db(conn, track_name, artist_name):
     
     return None
 
-def generate_m3u_from_db(playlist_name, spotify_playlist_json_path, output_path, test_mode=False, use_memory=True):
-    """Generate M3U playlist from Spotify JSON using direct database access."""
+def generate_m3u_from_db(playlist_name, spotify_playlist_json_path, output_path, test_mode=False, use_memory=True, library=None, layout=None, on_progress=None):
+    """Generate M3U playlist from Spotify JSON using direct database access.
     
-    with open(spotify_playlist_json_path, 'r', encoding='utf-8') as f:
-        spotify_tracks = json.load(f)
+    The track file may be NDJSON or a JSON array (see track_records); tracks are
+    read and the M3U written one at a time. Pass an already loaded
+    NavidromeLibrary as `library` to skip opening the database.
+    `layout` picks the in-memory storage layout otherwise (see library_class()).
+    `on_progress(processed, total, matched)` is called after every track.
+    """
+    
+    total_tracks, spotify_tracks = read_tracks(spotify_playlist_json_path)
 
     if test_mode:
         # Test with first 10 tracks only
-        spotify_tracks = spotify_tracks[:10]
-        print(f"Processing {len(spotify_tracks)} tracks (TEST MODE - first 10 only)...")
+        total_tracks = min(total_tracks, 10)
+        spotify_tracks = islice(spotify_tracks, 10)
+        print(f"Processing {total_tracks} tracks (TEST MODE - first 10 only)...")
     else:
-        print(f"Processing {len(spotify_tracks)} tracks...")
+        print(f"Processing {total_tracks} tracks...")
     
-    lines = ['#EXTM3U', '#PLAYLIST:' + playlist_name]
-    total_tracks = len(spotify_tracks)
+    # Written next to the output and moved into place once every track is processed
+    temp_output_path = f"{output_path}.tmp"
+    m3u = open(temp_output_path, 'w', encoding='utf-8')
+    m3u.write(f"#EXTM3U\n#PLAYLIST:{playlist_name}")
     matched_count = 0
     processed_count = 0
     failed_matches = []
 
-    # Simple progress indicator
+    # Progress line, printed a few times a second at most
     print(f"Processing tracks...", flush=True)
+    progress = ProgressReporter(
+        lambda state: print(
+            f"\r{int(state.fraction * 100)}% ({state.done}/{state.total}) - Matched: {state.details['matched']}"
+            f"{' - ' + state.summary() if state.summary() and not state.final else ''}",
+            flush=True
+        ),
+        total=total_tracks
+    )
 
     conn = None
     try:
-        # Open database connection
-        print(f"Opening database: {DB_PATH}", flush=True)
-        conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True)
-        print("Database connected successfully", flush=True)
-        
-        # Load library into memory for fast searching
-        library = None
-        if use_memory:
-            library = NavidromeLibrary(conn)
-        else:
-            # Start transaction for better performance with direct queries
-            conn.execute("BEGIN TRANSACTION")
+        if library is None:
+            # Open database connection
+            print(f"Opening database: {DB_PATH}", flush=True)
+            conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True)
+            print("Database connected successfully", flush=True)
+            
+            # Load library into memory for fast searching
+            if use_memory:
+                library = library_class(layout).load(conn)
+            else:
+                # Start transaction for better performance with direct queries
+                conn.execute("BEGIN TRANSACTION")
 
         for i, track in enumerate(spotify_tracks):
             track_name = track['track_name']
@@ -232,8 +789,7 @@ def generate_m3u_from_db(playlist_name, spotify_playlist_json_path, output_path,
                     full_path = f"/music/{file_path}"
                     # Build EXTINF line
                     extinf = f"#EXTINF:{duration_sec},{artist_name} - {track_name}"
-                    lines.append(extinf)
-                    lines.append(full_path)
+                    m3u.write(f"\n{extinf}\n{full_path}")
                     matched_count += 1
                 else:
                     failed_matches.append({
@@ -249,22 +805,25 @@ def generate_m3u_from_db(playlist_name, spotify_playlist_json_path, output_path,
                 })
             
             processed_count += 1
-            
-            # Simple progress indicator - print every few tracks
-            if processed_count % 5 == 0 or processed_count == total_tracks:
-                percent = int((processed_count / total_tracks) * 100)
-                print(f"\r{percent}% ({processed_count}/{total_tracks}) - Matched: {matched_count}", flush=True)
+            progress.update(processed_count, matched=matched_count)
+            if on_progress:
+                on_progress(processed_count, total_tracks, matched_count)
 
-        if not use_memory:
+        if library is None:
             conn.execute("COMMIT")
+        progress.finish()
 
     except sqlite3.Error as e:
         print(f"\nSQLite error: {e}", flush=True)
+        m3u.close()
+        os.remove(temp_output_path)
         raise RuntimeError(f"Database error: {e}")
     except Exception as e:
         print(f"\n!!! Unexpected error: {e}", flush=True)
         import traceback
         traceback.print_exc()
+        m3u.close()
+        os.remove(temp_output_path)
         raise RuntimeError(f"Failed to process tracks: {e}")
     finally:
         if conn:
@@ -273,9 +832,9 @@ def generate_m3u_from_db(playlist_name, spotify_playlist_json_path, output_path,
     print(f"\nCompleted! Matched {matched_count} out of {total_tracks} tracks.", flush=True)
     print(f"Success rate: {(matched_count/total_tracks)*100:.1f}%", flush=True)
 
-    # Write M3U file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(lines))
+    # Finish the M3U file
+    m3u.close()
+    os.replace(temp_output_path, output_path)
     
     print(f"M3U playlist written to: {output_path}")
     
@@ -343,20 +902,21 @@ def main():
             output_file = sys.argv[4] if len(sys.argv) > 4 else 'navidrome_playlist.m3u'
             # test_mode = '--full' not in sys.argv
             use_memory = '--no-memory' not in sys.argv
+            layout = 'columnar' if '--columnar' in sys.argv else None
             
             print(f"Using {'in-memory' if use_memory else 'direct database'} search mode")
             if not os.path.exists(spotify_json):
                 print(f"Error: Spotify playlist JSON file not found: {spotify_json}")
                 return
                 
-            generate_m3u_from_db(playlist_name, spotify_json, output_file, test_mode=False, use_memory=use_memory)
+            generate_m3u_from_db(playlist_name, spotify_json, output_file, test_mode=False, use_memory=use_memory, layout=layout)
 
         else:
             print("Unknown command. Use 'list' or 'generate'")
     else:
         print("Usage:")
         print("  python spoti_playlist_from_db.py list")
-        print("  python spoti_playlist_from_db.py generate [spotify_json] [output_m3u] [--full]")
+        print("  python spoti_playlist_from_db.py generate [spotify_json] [output_m3u] [--full] [--no-memory] [--columnar]")
         print("\nExamples:")
         print("  python spoti_playlist_from_db.py generate playlist_tracks.json navidrome_playlist.m3u")
         print("  python spoti_playlist_from_db.py generate playlist_tracks.json navidrome_playlist.m3u --full")
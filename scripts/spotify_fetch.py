@@ -0,0 +1,350 @@
+"""Concurrent, paginated fetching of Spotify playlist tracks and liked songs.
+
+Shared by the web app and the fetch_spotify_*.py scripts. The first page gives
+the total, so every remaining offset is known up front and the pages are
+fetched by a small worker pool and handed on in order, page by page, so they
+can be written out as NDJSON while the rest are still arriving. Playlist tracks
+are cached by snapshot_id and liked songs synced incrementally against a
+snapshot, both kept in DATA_DIR.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from spotipy.exceptions import SpotifyException
+
+from track_records import TrackWriter
+
+# Pages fetched at once; Spotify rate limits per app, so keep this modest
+SPOTIFY_MAX_IN_FLIGHT = int(os.getenv('SPOTIFY_MAX_IN_FLIGHT', 4))
+# Retries of a page after 429 Too Many Requests (spotipy's own retries come first)
+SPOTIFY_RATE_LIMIT_RETRIES = 5
+
+PLAYLIST_PAGE_SIZE = 100
+LIKED_PAGE_SIZE = 50
+
+DATA_DIR = os.getenv('DATA_DIR', 'data')
+# Tracks of each fetched playlist, reused while its snapshot_id is unchanged
+PLAYLIST_CACHE_DIR = os.path.join(DATA_DIR, 'playlists')
+# Last fetched liked songs per user, for incremental syncs
+LIKED_SNAPSHOT_DIR = os.path.join(DATA_DIR, 'liked_songs')
+# Days between full liked-song refetches, which also catch changes the incremental check can't see
+LIKED_FULL_SYNC_DAYS = float(os.getenv('LIKED_FULL_SYNC_DAYS', 7))
+
+PLAYLIST_META_FIELDS = 'id,name,snapshot_id,tracks(total)'
+# Only what track_record() reads; drops album objects, images, available_markets and the rest
+PLAYLIST_ITEM_FIELDS = 'items(added_at,track(id,name,uri,duration_ms,popularity,artists(id,name),album(id,name))),next,total'
+
+
+def track_record(item):
+    """Flatten a playlist or saved-track item into our track dict; None for removed tracks."""
+    track = item.get('track')
+    if track is None:
+        return None
+    return {
+        'track_id': track['id'],
+        'track_name': track['name'],
+        'artist_name': ', '.join([artist['name'] for artist in track['artists']]),
+        'artist_id': ', '.join([artist['id'] for artist in track['artists']]),
+        'album_name': track['album']['name'],
+        'album_id': track['album']['id'],
+        'added_at': item.get('added_at', ''),
+        'track_uri': track['uri'],
+        'popularity': track.get('popularity', ''),
+        'duration_ms': track.get('duration_ms', '')
+    }
+
+
+def strip_item(item):
+    """Reduce an item to the fields track_record() reads, for endpoints without a `fields` filter."""
+    track = item.get('track')
+    if track is None:
+        return {'added_at': item.get('added_at', ''), 'track': None}
+    album = track.get('album') or {}
+    return {
+        'added_at': item.get('added_at', ''),
+        'track': {
+            'id': track.get('id'),
+            'name': track.get('name'),
+            'uri': track.get('uri'),
+            'duration_ms': track.get('duration_ms', ''),
+            'popularity': track.get('popularity', ''),
+            'artists': [{'id': a.get('id'), 'name': a.get('name')} for a in track.get('artists', [])],
+            'album': {'id': album.get('id'), 'name': album.get('name')}
+        }
+    }
+
+
+def _stripped(fetch_page):
+    """Wrap a page fetcher so each page is reduced with strip_item() as it arrives."""
+    def fetch(offset, limit):
+        page = fetch_page(offset, limit)
+        page['items'] = [strip_item(item) for item in page['items']]
+        return page
+    return fetch
+
+
+class RateLimitGate:
+    """Makes every worker wait out a 429's Retry-After, not just the one that got it."""
+
+    def __init__(self):
+        self._resume_at = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+def _retry_after(error, attempt):
+    try:
+        return float((error.headers or {}).get('Retry-After'))
+    except (TypeError, ValueError):
+        return 2 ** attempt
+
+
+def _fetch_page(fetch_page, offset, limit, gate):
+    for attempt in range(SPOTIFY_RATE_LIMIT_RETRIES + 1):
+        gate.wait()
+        try:
+            return fetch_page(offset, limit)
+        except SpotifyException as e:
+            if e.http_status != 429 or attempt == SPOTIFY_RATE_LIMIT_RETRIES:
+                raise
+            gate.pause(_retry_after(e, attempt))
+
+
+def iter_pages(fetch_page, limit, on_progress=None, max_in_flight=None):
+    """Yield (items, total) for every page of a paginated Spotify endpoint, in offset order.
+
+    `fetch_page(offset, limit)` returns one page (a dict with 'items' and
+    'total'). After the first page, up to `max_in_flight` pages are fetched
+    ahead concurrently, so at most that many are held in memory at once.
+    `on_progress(fetched, total)` is called as each page is handed on.
+    """
+    gate = RateLimitGate()
+    first = _fetch_page(fetch_page, 0, limit, gate)
+    total = first.get('total') or 0
+    fetched = len(first['items'])
+    if on_progress:
+        on_progress(fetched, total)
+    yield first['items'], total
+
+    offsets = iter(range(limit, total, limit))
+    window = max_in_flight or SPOTIFY_MAX_IN_FLIGHT
+    with ThreadPoolExecutor(max_workers=window) as pool:
+        pending = deque()
+        for offset in offsets:
+            pending.append(pool.submit(_fetch_page, fetch_page, offset, limit, gate))
+            if len(pending) == window:
+                break
+        while pending:
+            items = pending.popleft().result()['items']
+            offset = next(offsets, None)
+            if offset is not None:
+                pending.append(pool.submit(_fetch_page, fetch_page, offset, limit, gate))
+            fetched += len(items)
+            if on_progress:
+                on_progress(fetched, total)
+            yield items, total
+
+
+def _records(items):
+    return [record for record in map(track_record, items) if record is not None]
+
+
+def _write_pages(pages, writer):
+    """Write each page's track records as it arrives; returns the endpoint's total."""
+    total = 0
+    for items, total in pages:
+        writer.write_all(_records(items))
+    return total
+
+
+def _playlist_pages(sp, playlist_id, on_progress, max_in_flight, projected):
+    # With `projected`, Spotify sends only PLAYLIST_ITEM_FIELDS, several times smaller
+    fields = PLAYLIST_ITEM_FIELDS if projected else None
+    return iter_pages(
+        lambda offset, limit: sp.playlist_items(playlist_id, fields=fields, limit=limit, offset=offset),
+        PLAYLIST_PAGE_SIZE, on_progress, max_in_flight
+    )
+
+
+def _liked_pages(sp, on_progress, max_in_flight, projected):
+    # Saved tracks can't be projected server-side, so each page is stripped as it arrives
+    fetch_page = lambda offset, limit: sp.current_user_saved_tracks(limit=limit, offset=offset)
+    if projected:
+        fetch_page = _stripped(fetch_page)
+    return iter_pages(fetch_page, LIKED_PAGE_SIZE, on_progress, max_in_flight)
+
+
+def _cache_paths(key, cache_dir):
+    """(tracks NDJSON, metadata JSON) paths for a cached track list."""
+    base = os.path.join(cache_dir, re.sub(r'[^A-Za-z0-9_.-]', '_', key))
+    return f"{base}.ndjson", f"{base}.json"
+
+
+def _load_meta(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_meta(path, meta):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+_cache_locks = {}
+_cache_locks_lock = threading.Lock()
+
+
+def _cache_lock(path):
+    """Lock serializing the updates of one cached track file within this process."""
+    with _cache_locks_lock:
+        return _cache_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def cached_playlist_tracks(sp, playlist_id, path, on_progress=None, cache_dir=None):
+    """Write a playlist's tracks to `path` as NDJSON, reusing cached tracks when unchanged.
+
+    Spotify changes a playlist's snapshot_id whenever its contents change, so
+    the cache is keyed by (playlist_id, snapshot_id): an unchanged playlist
+    costs one metadata request. Returns (playlist, count, cached), where
+    `playlist` holds id, name, snapshot_id and tracks.total.
+    """
+    playlist = sp.playlist(playlist_id, fields=PLAYLIST_META_FIELDS)
+    tracks_path, meta_path = _cache_paths(playlist_id, cache_dir or PLAYLIST_CACHE_DIR)
+    # A second fetch of the same playlist waits here, then finds the first one's result
+    with _cache_lock(tracks_path):
+        meta = _load_meta(meta_path)
+        cached = bool(meta and meta.get('snapshot_id') == playlist['snapshot_id'] and os.path.exists(tracks_path))
+
+        if not cached:
+            with TrackWriter(tracks_path) as writer:
+                _write_pages(_playlist_pages(sp, playlist_id, on_progress, None, True), writer)
+            meta = {
+                'playlist_id': playlist_id,
+                'snapshot_id': playlist['snapshot_id'],
+                'name': playlist['name'],
+                'count': writer.count,
+                'fetched_at': time.time(),
+            }
+            _save_meta(meta_path, meta)
+        shutil.copyfile(tracks_path, path)
+    return playlist, meta['count'], cached
+
+
+def _fetch_new_liked(sp, meta):
+    """Page newest-first until reaching one of the newest tracks the snapshot already has.
+
+    Returns (new tracks, total), or None when the snapshot can't simply be
+    extended: no known track was reached, or the counts don't add up because
+    something was removed.
+    """
+    recent = {tuple(key) for key in meta['recent']}
+    fetch_page = _stripped(lambda offset, limit: sp.current_user_saved_tracks(limit=limit, offset=offset))
+    gate = RateLimitGate()
+    new_items = []
+    offset = 0
+    while True:
+        page = _fetch_page(fetch_page, offset, LIKED_PAGE_SIZE, gate)
+        total = page.get('total') or 0
+        for item in page['items']:
+            track = item['track']
+            if track is not None and (track['id'], item.get('added_at', '')) in recent:
+                if meta['total'] + len(new_items) != total:
+                    return None
+                return _records(new_items), total
+            new_items.append(item)
+        offset += len(page['items'])
+        if not page['items'] or offset >= total:
+            return None
+
+
+def _recent_keys(tracks_path):
+    """(track_id, added_at) of the newest page of tracks in a snapshot: where the next sync stops."""
+    keys = []
+    with open(tracks_path, encoding='utf-8') as f:
+        for line in f:
+            if len(keys) == LIKED_PAGE_SIZE:
+                break
+            if line.strip():
+                track = json.loads(line)
+                keys.append([track['track_id'], track['added_at']])
+    return keys
+
+
+def sync_liked_tracks(sp, user_id, path, on_progress=None, full=False, snapshot_dir=None):
+    """Write the user's liked songs to `path` as NDJSON, fetching only what's new.
+
+    Saved tracks come newest first, so with a stored snapshot only the pages
+    above the newest known tracks are fetched (usually one request) and put in
+    front of the snapshot. A full fetch runs instead when there is no snapshot,
+    when `full` is set, every LIKED_FULL_SYNC_DAYS, or when the counts show
+    tracks were removed. Returns (count, total, info); `info` holds 'mode'
+    ('incremental' or 'full') and 'new' (tracks added since the last sync; net
+    of removals for a full sync).
+    """
+    tracks_path, meta_path = _cache_paths(user_id, snapshot_dir or LIKED_SNAPSHOT_DIR)
+    with _cache_lock(tracks_path):
+        meta = _load_meta(meta_path)
+        if meta and not os.path.exists(tracks_path):
+            meta = None
+        now = time.time()
+        full_due = (
+            full or meta is None
+            or now - meta.get('full_synced_at', 0) > LIKED_FULL_SYNC_DAYS * 86400
+        )
+
+        result = None if full_due else _fetch_new_liked(sp, meta)
+        if result is not None:
+            new_tracks, total = result
+            if new_tracks:
+                with TrackWriter(tracks_path) as writer:
+                    writer.write_all(new_tracks)
+                    writer.append_file(tracks_path)
+                meta.update(count=writer.count, recent=_recent_keys(tracks_path))
+            meta.update(total=total, synced_at=now)
+            info = {'mode': 'incremental', 'new': len(new_tracks)}
+            if on_progress:
+                on_progress(total, total)
+        else:
+            previous_count = meta['count'] if meta else 0
+            with TrackWriter(tracks_path) as writer:
+                total = _write_pages(_liked_pages(sp, on_progress, None, True), writer)
+            meta = {
+                'user_id': user_id,
+                'total': total,
+                'count': writer.count,
+                'recent': _recent_keys(tracks_path),
+                'synced_at': now,
+                'full_synced_at': now,
+            }
+            info = {'mode': 'full', 'new': max(0, writer.count - previous_count)}
+
+        _save_meta(meta_path, meta)
+        shutil.copyfile(tracks_path, path)
+    return meta['count'], total, info
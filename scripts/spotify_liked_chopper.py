@@ -3,6 +3,8 @@ from spotipy.oauth2 import SpotifyOAuth
 import os
 from dotenv import load_dotenv
 
+from progress_reporter import ProgressReporter
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -27,6 +29,9 @@ limit = 50
 offset = 0
 
 print("Fetching liked songs...")
+progress = ProgressReporter(
+    lambda state: print(f"Fetched {state.done} of {state.total} liked songs so far... {state.summary()}")
+)
 while True:
     results = sp.current_user_saved_tracks(limit=limit, offset=offset)
     items = results['items']
@@ -34,8 +39,8 @@ while True:
         break
     liked_tracks.extend([item['track']['id'] for item in items])
     offset += len(items)
-    if offset % 100 == 0:
-        print(f"Fetched {offset} liked songs so far...")
+    progress.update(offset, results['total'])
+progress.finish()
 
 print(f"Fetched {len(liked_tracks)} liked songs.")
 
@@ -0,0 +1,266 @@
+"""Track record files: NDJSON, one track dict per line, written and read incrementally.
+
+Fetch tasks write each page's records as it arrives, and the M3U, MusicBrainz
+and download stages iterate the file lazily, so memory stays flat however large
+the library is. JSON array files from older exports are still read, though
+those have to be loaded whole. TrackIndex serves sorted, filtered pages of an
+NDJSON file by seeking to the lines it needs.
+"""
+import csv
+import json
+import os
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+
+
+class TrackWriter:
+    """Write track records to `path` as NDJSON; the file is replaced atomically on close().
+
+    Used as a context manager, the partial file is discarded if the block raises.
+    Each writer gets its own temp file next to `path`, so concurrent writers of
+    the same path never interleave; the last one to close wins.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, self._temp_path = tempfile.mkstemp(
+            prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory or '.'
+        )
+        self._file = os.fdopen(fd, 'w', encoding='utf-8')
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write('\n')
+        self.count += 1
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+
+    def append_file(self, path):
+        """Append the records of another NDJSON track file without parsing them."""
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    self._file.write(line if line.endswith('\n') else f"{line}\n")
+                    self.count += 1
+
+    def close(self):
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _is_json_array(f):
+    """Peek at the first non-blank character: '[' means a JSON array, not NDJSON."""
+    while True:
+        char = f.read(1)
+        if not char or not char.isspace():
+            f.seek(0)
+            return char == '['
+
+
+def iter_tracks(path):
+    """Yield the track records in an NDJSON (or legacy JSON array) file, one at a time."""
+    with open(path, encoding='utf-8') as f:
+        if _is_json_array(f):
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_tracks(path):
+    """Return (count, records) for a track file, with records iterated lazily.
+
+    Counting an NDJSON file is one pass over its lines; a legacy JSON array is
+    loaded once and iterated from memory.
+    """
+    with open(path, encoding='utf-8') as f:
+        if _is_json_array(f):
+            tracks = json.load(f)
+            return len(tracks), iter(tracks)
+        count = sum(1 for line in f if line.strip())
+    return count, iter_tracks(path)
+
+
+def export_tracks(records, basename):
+    """Write records to <basename>.json (a JSON array, one record per line) and <basename>.csv.
+
+    Both files are streamed, so records can be a lazy iterator. Returns the
+    number of records; with none, no CSV is written.
+    """
+    count = 0
+    with open(f"{basename}.json", 'w', encoding='utf-8') as json_file, \
+            open(f"{basename}.csv", 'w', encoding='utf-8', newline='') as csv_file:
+        writer = None
+        json_file.write('[')
+        for record in records:
+            json_file.write(',\n' if count else '\n')
+            json_file.write(json.dumps(record, ensure_ascii=False))
+            if writer is None:
+                writer = csv.DictWriter(csv_file, record.keys())
+                writer.writeheader()
+            writer.writerow(record)
+            count += 1
+        json_file.write('\n]\n')
+    if not count:
+        os.remove(f"{basename}.csv")
+    return count
+
+
+
+# Fields a TrackIndex can sort by, and the ones its search matches against
+SORT_FIELDS = ('track_name', 'artist_name', 'album_name', 'added_at', 'popularity', 'duration_ms')
+SEARCH_FIELDS = ('track_name', 'artist_name', 'album_name')
+# Track files with an index kept in memory, and search results kept per index
+TRACK_INDEX_CACHE_SIZE = 8
+SEARCH_CACHE_SIZE = 8
+
+
+def _sort_key(value):
+    # Missing values ('' or None) sort first; strings case-insensitively
+    if value is None or value == '':
+        return (0, '')
+    if isinstance(value, str):
+        return (1, value.casefold())
+    return (1, value)
+
+
+class TrackIndex:
+    """Byte offsets of the records in an NDJSON track file, for paging without loading it.
+
+    Sort orders and search matches are computed with one pass over the file the
+    first time they are asked for and kept as compact arrays of line numbers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._offsets = array('Q')
+        with open(path, 'rb') as f:
+            if f.read(1) == b'[':
+                raise ValueError(f"{path} is a JSON array, not an NDJSON track file")
+            f.seek(0)
+            position = 0
+            for line in f:
+                if line.strip():
+                    self._offsets.append(position)
+                position += len(line)
+        self._orders = {}
+        self._searches = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _scan(self):
+        """Yield (line number, record) for every record in the file."""
+        with open(self.path, encoding='utf-8') as f:
+            line_number = 0
+            for line in f:
+                if line.strip():
+                    yield line_number, json.loads(line)
+                    line_number += 1
+
+    def _order(self, sort):
+        with self._lock:
+            order = self._orders.get(sort)
+        if order is None:
+            keys = [_sort_key(record.get(sort)) for _, record in self._scan()]
+            order = array('I', sorted(range(len(keys)), key=keys.__getitem__))
+            with self._lock:
+                self._orders[sort] = order
+        return order
+
+    def _matches(self, query):
+        """A bytearray with 1 at the line numbers whose SEARCH_FIELDS contain `query`."""
+        with self._lock:
+            mask = self._searches.get(query)
+            if mask is not None:
+                self._searches.move_to_end(query)
+                return mask
+        mask = bytearray(len(self))
+        for line_number, record in self._scan():
+            if any(query in str(record.get(field) or '').casefold() for field in SEARCH_FIELDS):
+                mask[line_number] = 1
+        with self._lock:
+            self._searches[query] = mask
+            while len(self._searches) > SEARCH_CACHE_SIZE:
+                self._searches.popitem(last=False)
+        return mask
+
+    def _read(self, line_numbers):
+        records = []
+        with open(self.path, 'rb') as f:
+            for line_number in line_numbers:
+                f.seek(self._offsets[line_number])
+                records.append(json.loads(f.readline()))
+        return records
+
+    def page(self, offset=0, limit=50, sort=None, descending=False, query=None):
+        """Return (matching, records) for one page.
+
+        `sort` is one of SORT_FIELDS (file order otherwise) and `query` a
+        case-insensitive substring of the track, artist or album name.
+        `matching` counts all records that match, for working out page numbers.
+        """
+        if sort is not None and sort not in SORT_FIELDS:
+            raise ValueError(f"Can't sort by {sort!r}")
+        order = self._order(sort) if sort else range(len(self))
+        if descending:
+            order = order[::-1]
+        query = (query or '').strip().casefold()
+
+        if not query:
+            return len(self), self._read(order[offset:offset + limit])
+
+        mask = self._matches(query)
+        matching = 0
+        selected = []
+        for line_number in order:
+            if mask[line_number]:
+                if offset <= matching < offset + limit:
+                    selected.append(line_number)
+                matching += 1
+        return matching, self._read(selected)
+
+
+_track_indexes = OrderedDict()
+_track_indexes_lock = threading.Lock()
+
+
+def get_track_index(path):
+    """The TrackIndex for a file, reused until the file changes."""
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    with _track_indexes_lock:
+        cached = _track_indexes.get(path)
+        if cached and cached[0] == key:
+            _track_indexes.move_to_end(path)
+            return cached[1]
+    index = TrackIndex(path)
+    with _track_indexes_lock:
+        _track_indexes[path] = (key, index)
+        _track_indexes.move_to_end(path)
+        while len(_track_indexes) > TRACK_INDEX_CACHE_SIZE:
+            _track_indexes.popitem(last=False)
+    return index
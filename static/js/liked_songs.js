@@ -87,8 +87,10 @@ document.addEventListener('DOMContentLoaded', () => {
         try {
             window.spotifyApp.showProgress('Fetching Liked Songs');
             
+            const fullSync = document.getElementById('full-liked-sync');
             const response = await window.spotifyApp.makeRequest('/api/fetch-liked-songs', {
-                method: 'POST'
+                method: 'POST',
+                body: JSON.stringify({ full_sync: Boolean(fullSync && fullSync.checked) })
             });
 
             // Progress updates will be handled by socket events
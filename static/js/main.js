@@ -4,11 +4,16 @@ class SpotifyMigrationApp {
         this.socket = null;
         this.currentTempFile = null;
         this.currentPlaylistName = null;
-        this.currentPlaylistData = null;
         this.currentLikedSongsData = null;
         this.foundAlbums = [];  // Albums found in MusicBrainz
         this.currentPage = 1;
         this.tracksPerPage = 50;
+        // Track pages come from /api/tracks; these narrow and order them
+        this.trackTotal = 0;
+        this.trackQuery = '';
+        this.trackSort = '';
+        this.trackOrder = 'asc';
+        this.trackPageRequest = 0;
         this.init();
     }
 
@@ -51,6 +56,22 @@ class SpotifyMigrationApp {
         });
     }
 
+    // Follow a background job started elsewhere (another tab or client); the server
+    // replays its latest progress. Jobs this browser session started are followed
+    // automatically.
+    attachJob(jobId) {
+        return new Promise((resolve) => {
+            this.socket.emit('attach_job', { job_id: jobId }, resolve);
+        });
+    }
+
+    // Stop receiving a job's events on this page
+    detachJob(jobId) {
+        return new Promise((resolve) => {
+            this.socket.emit('detach_job', { job_id: jobId }, resolve);
+        });
+    }
+
     bindEvents() {
         // Global error handling
         window.addEventListener('error', (e) => {
@@ -181,9 +202,11 @@ class SpotifyMigrationApp {
     handlePlaylistFetched(data) {
         this.currentTempFile = data.temp_file;
         this.currentPlaylistName = data.playlist_name;
-        this.currentPlaylistData = data.tracks;
         this.foundAlbums = [];  // Reset MB status
         this.currentPage = 1;
+        this.trackTotal = data.track_count;
+        this.trackQuery = '';
+        this.trackSort = '';
 
         // Show playlist results
         const resultsDiv = document.getElementById('playlist-results');
@@ -205,21 +228,44 @@ class SpotifyMigrationApp {
         }
     }
 
-    // Render current page of tracks
-    renderTrackPage() {
+    // Fetch and render the current page of tracks
+    async renderTrackPage() {
         const trackList = document.getElementById('track-list');
         const countDisplay = document.getElementById('track-count-display');
         const paginationInfo = document.getElementById('pagination-info');
         const prevPage = document.getElementById('prev-page');
         const nextPage = document.getElementById('next-page');
 
-        if (!trackList || !this.currentPlaylistData) return;
+        if (!trackList || !this.currentTempFile) return;
+
+        const params = new URLSearchParams({
+            temp_file: this.currentTempFile,
+            offset: (this.currentPage - 1) * this.tracksPerPage,
+            limit: this.tracksPerPage
+        });
+        if (this.trackQuery) {
+            params.set('q', this.trackQuery);
+        }
+        if (this.trackSort) {
+            params.set('sort', this.trackSort);
+            params.set('order', this.trackOrder);
+        }
+
+        const request = ++this.trackPageRequest;
+        let page;
+        try {
+            page = await this.makeRequest(`/api/tracks?${params}`);
+        } catch (error) {
+            this.showError(`Failed to load tracks: ${error.message}`);
+            return;
+        }
+        // A newer page was asked for while this one loaded
+        if (request !== this.trackPageRequest) return;
 
-        const totalTracks = this.currentPlaylistData.length;
-        const totalPages = Math.ceil(totalTracks / this.tracksPerPage);
-        const startIdx = (this.currentPage - 1) * this.tracksPerPage;
-        const endIdx = Math.min(startIdx + this.tracksPerPage, totalTracks);
-        const pageTracks = this.currentPlaylistData.slice(startIdx, endIdx);
+        const totalTracks = page.total;
+        const totalPages = Math.max(1, Math.ceil(totalTracks / this.tracksPerPage));
+        const pageTracks = page.tracks;
+        this.trackTotal = totalTracks;
 
         // Update count display
         if (countDisplay) {
@@ -285,7 +331,7 @@ class SpotifyMigrationApp {
         if (nextPage) {
             nextPage.onclick = (e) => {
                 e.preventDefault();
-                const totalPages = Math.ceil(this.currentPlaylistData.length / this.tracksPerPage);
+                const totalPages = Math.ceil(this.trackTotal / this.tracksPerPage);
                 if (this.currentPage < totalPages) {
                     this.currentPage++;
                     this.renderTrackPage();
@@ -9,12 +9,17 @@ document.addEventListener('DOMContentLoaded', () => {
     const userPlaylistsDiv = document.getElementById('user-playlists');
     const mbScanStatus = document.getElementById('mb-scan-status');
     const mbScanMessage = document.getElementById('mb-scan-message');
+    const mbScanJobsCard = document.getElementById('mb-scan-jobs-card');
+    const mbScanJobsDiv = document.getElementById('mb-scan-jobs');
+    const trackSearchInput = document.getElementById('track-search');
+    const trackSortSelect = document.getElementById('track-sort');
 
     // Track current MB file for Lidarr
     let currentMBFile = null;
 
-    // Load user playlists on page load
+    // Load user playlists and any interrupted MB scans on page load
     loadUserPlaylists();
+    loadMBScanJobs();
 
     // Listen for MB scan complete event
     if (window.spotifyApp && window.spotifyApp.socket) {
@@ -39,11 +44,19 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             window.spotifyApp.showSuccess(data.message);
+            loadMBScanJobs();
         });
 
         // Reset MB state when new playlist is fetched
         window.spotifyApp.socket.on('playlist_fetched', () => {
             currentMBFile = null;
+            // A new playlist starts unfiltered
+            if (trackSearchInput) {
+                trackSearchInput.value = '';
+            }
+            if (trackSortSelect) {
+                trackSortSelect.value = '';
+            }
             if (sendToLidarrBtn) {
                 sendToLidarrBtn.disabled = true;
             }
@@ -116,6 +129,30 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    // Search and sort the track list; the server returns the matching page
+    let trackSearchTimer = null;
+    if (trackSearchInput) {
+        trackSearchInput.addEventListener('input', () => {
+            clearTimeout(trackSearchTimer);
+            trackSearchTimer = setTimeout(() => {
+                window.spotifyApp.trackQuery = trackSearchInput.value.trim();
+                window.spotifyApp.currentPage = 1;
+                window.spotifyApp.renderTrackPage();
+            }, 300);
+        });
+    }
+
+    if (trackSortSelect) {
+        trackSortSelect.addEventListener('change', () => {
+            // Values look like "artist_name:asc"; empty keeps playlist order
+            const [sort, order] = trackSortSelect.value.split(':');
+            window.spotifyApp.trackSort = sort || '';
+            window.spotifyApp.trackOrder = order || 'asc';
+            window.spotifyApp.currentPage = 1;
+            window.spotifyApp.renderTrackPage();
+        });
+    }
+
     // Load user playlists
     async function loadUserPlaylists() {
         try {
@@ -236,6 +273,57 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Load MusicBrainz scans that were interrupted before finishing
+    async function loadMBScanJobs() {
+        if (!mbScanJobsCard || !mbScanJobsDiv) {
+            return;
+        }
+
+        try {
+            const response = await window.spotifyApp.makeRequest('/api/mb-scan-jobs');
+            const jobs = response.jobs || [];
+            if (!jobs.length) {
+                mbScanJobsCard.style.display = 'none';
+                return;
+            }
+
+            mbScanJobsDiv.innerHTML = jobs.map(job => `
+                <div class="d-flex align-items-center justify-content-between mb-2">
+                    <div>
+                        <h6 class="mb-0">${window.spotifyApp.escapeHtml(job.name)}</h6>
+                        <small class="text-muted">${job.done} of ${job.total} albums scanned</small>
+                    </div>
+                    <button type="button" class="btn btn-sm btn-outline-info resume-mb-scan" data-job-id="${job.job_id}">
+                        <i class="fas fa-play me-1"></i>Resume
+                    </button>
+                </div>
+            `).join('');
+            mbScanJobsCard.style.display = 'block';
+
+            mbScanJobsDiv.querySelectorAll('.resume-mb-scan').forEach(button => {
+                button.addEventListener('click', () => resumeMBScan(button.dataset.jobId));
+            });
+        } catch (error) {
+            console.error('Failed to load interrupted MB scans:', error);
+        }
+    }
+
+    // Resume an interrupted MusicBrainz scan
+    async function resumeMBScan(jobId) {
+        try {
+            window.spotifyApp.showProgress('Resuming MusicBrainz Scan');
+
+            await window.spotifyApp.makeRequest(`/api/mb-scan-jobs/${encodeURIComponent(jobId)}/resume`, {
+                method: 'POST'
+            });
+
+            // Progress updates will be handled by socket events
+        } catch (error) {
+            window.spotifyApp.hideProgress();
+            window.spotifyApp.showError(`Failed to resume MusicBrainz scan: ${error.message}`);
+        }
+    }
+
     // Send to Lidarr
     async function sendToLidarr() {
         try {
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""JobRegistry: per-pool worker limits, queue positions, dedup and the queue bound."""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from jobs import JobRegistry, QueueFull
+
+
+class FakeServer:
+    def __init__(self):
+        self.rooms = []
+
+    def enter_room(self, sid, room, namespace=None):
+        self.rooms.append((sid, room))
+
+    def leave_room(self, sid, room, namespace=None):
+        self.rooms.remove((sid, room))
+
+
+class FakeSocketIO:
+    def __init__(self):
+        self.server = FakeServer()
+        self.events = []
+
+    def emit(self, event, data, to=None, namespace=None):
+        self.events.append((event, data, to))
+
+
+def make_registry(workers=1, max_queued=3):
+    socketio = FakeSocketIO()
+    registry = JobRegistry(socketio, max_queued=max_queued)
+    registry.add_pool("musicbrainz", workers, ["mb_scan"])
+    return registry, socketio
+
+
+def blocking_task(release, running=None):
+    def task(job):
+        if running is not None:
+            running.append(job.id)
+        release.wait(5)
+    return task
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_pool_runs_at_most_its_workers_in_order():
+    registry, socketio = make_registry(workers=1)
+    release = threading.Event()
+    running = []
+    jobs = [registry.start("mb_scan", "a", blocking_task(release, running), key=i) for i in range(3)]
+    wait_until(lambda: running)
+
+    assert [job.status for job in jobs] == ["running", "queued", "queued"]
+    (pool,) = registry.queue_status("a")
+    assert (pool["workers"], pool["running"], pool["queued"]) == (1, 1, 2)
+    assert [(job["job_id"], job["queue_position"]) for job in pool["jobs"]] == [
+        (jobs[0].id, None), (jobs[1].id, 1), (jobs[2].id, 2)
+    ]
+    # Jobs that have to wait are told how many are ahead of them
+    queued_messages = [data["message"] for event, data, to in socketio.events if event == "progress"]
+    assert queued_messages == ["Queued behind 1 musicbrainz job...", "Queued behind 2 musicbrainz jobs..."]
+
+    release.set()
+    wait_until(lambda: all(job.status == "done" for job in jobs))
+    assert running == [job.id for job in jobs]
+
+
+def test_identical_pending_job_is_reused():
+    registry, _ = make_registry()
+    release = threading.Event()
+    first = registry.start("mb_scan", "a", blocking_task(release), key=("file", "name"))
+    queued = registry.start("mb_scan", "a", blocking_task(release), key="other")
+
+    assert registry.start("mb_scan", "a", blocking_task(release), key=("file", "name")) is first
+    assert registry.start("mb_scan", "a", blocking_task(release), key="other") is queued
+    # Another session, or another key, gets a job of its own
+    assert registry.start("mb_scan", "b", blocking_task(release), key=("file", "name")) is not first
+    assert registry.start("mb_scan", "a", blocking_task(release), key="third") is not queued
+
+    release.set()
+    wait_until(lambda: first.status == "done")
+    # Once finished, the same request starts a new job
+    assert registry.start("mb_scan", "a", lambda job: None, key=("file", "name")) is not first
+    release.set()
+
+
+def test_full_queue_is_refused():
+    registry, _ = make_registry(max_queued=2)
+    release = threading.Event()
+    running = []
+    registry.start("mb_scan", "a", blocking_task(release, running), key=0)
+    wait_until(lambda: running)
+    registry.start("mb_scan", "a", blocking_task(release), key=1)
+    registry.start("mb_scan", "a", blocking_task(release), key=2)
+
+    try:
+        registry.start("mb_scan", "a", blocking_task(release), key=3)
+    except QueueFull:
+        pass
+    else:
+        raise AssertionError("a third queued job should be refused")
+    assert registry.queue_status()[0]["queued"] == 2
+    release.set()
+
+
+def test_failed_job_is_marked_and_reported():
+    registry, socketio = make_registry()
+
+    def fail(job):
+        raise RuntimeError("boom")
+
+    job = registry.start("mb_scan", "a", fail)
+    wait_until(lambda: job.finished_at)
+    assert job.status == "error"
+    assert ("error", {"message": "Error: boom", "job_id": job.id}, job.room) in socketio.events
+
+
+def test_only_the_owner_can_follow_a_job():
+    registry, _ = make_registry()
+    job = registry.start("mb_scan", "a", lambda job: None)
+
+    assert registry.get(job.id, "b") is None
+    assert registry.attach(job.id, "sid-b", "b") is None
+    assert registry.attach(job.id, "sid-x", None) is None
+    assert registry.attach(job.id, "sid-a", "a") is job
+
+
+if __name__ == '__main__':
+    test_pool_runs_at_most_its_workers_in_order()
+    test_identical_pending_job_is_reused()
+    test_full_queue_is_refused()
+    test_failed_job_is_marked_and_reported()
+    test_only_the_owner_can_follow_a_job()
+    print("ok")
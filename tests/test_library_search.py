@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""The trigram candidate lookup must find the same track as scanning every title."""
+import os
+import random
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from spoti_playlist_to_m3u import ColumnarLibrary, NavidromeLibrary
+
+WORDS = ['love', 'night', 'the', 'song', 'blue', 'heart', 'fire', 'rain', 'a', 'in', 'of',
+         'dream', 'é', 'remix', 'live', 'home', 'go', 'x', 'ab']
+SHORT_TITLES = ['A', 'Go', 'Hi', 'X', 'ab', 'Yo']
+
+
+def make_library_db(size=1500, seed=7):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(':memory:')
+    conn.execute("""
+        CREATE TABLE media_file (id TEXT PRIMARY KEY, path TEXT, title TEXT, artist TEXT,
+            album_artist TEXT, album TEXT, duration REAL, created_at TEXT, updated_at TEXT)
+    """)
+    artists = [f"Artist {i}" for i in range(60)]
+    rows = []
+    for i in range(size):
+        if i % 25 == 0:
+            title = rng.choice(SHORT_TITLES)
+        else:
+            title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+            if i % 9 == 0:
+                title += f" (feat. {rng.choice(artists)})"
+        artist = rng.choice(artists)
+        if i % 5 == 0:
+            artist += f" • {rng.choice(artists)}"
+        stamp = f"2024-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}"
+        rows.append((f"id{i}", f"{artist}/{title}/{i}.mp3", title, artist, artist.split(' • ')[0],
+                     f"Album {i // 12}", 180 + i % 200, stamp, stamp))
+    conn.executemany("INSERT INTO media_file VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return conn, rows
+
+
+def make_queries(rows, seed=11):
+    rng = random.Random(seed)
+    queries = []
+    for row in rng.sample(rows, 300):
+        title, artist = row[2], row[3].split(' • ')[0]
+        queries.append((title, artist))
+        # Substring of the title, which only the fuzzy strategy can find
+        queries.append((title[1:-1] if len(title) > 4 else title, artist))
+        # Near misses: one letter changed, or the right title by another artist
+        position = rng.randrange(len(title))
+        queries.append((title[:position] + 'q' + title[position + 1:], artist))
+        queries.append((title, 'Nobody Famous'))
+    for title in SHORT_TITLES + ['', 'e', 'ov', 'Zzz Never']:
+        queries.append((title, 'Artist 3'))
+        queries.append((f"{title} (feat. Artist 4)", 'Artist 3, Artist 4'))
+    return queries
+
+
+def linear_scan(library):
+    """The same library, with the candidate lookup replaced by a scan of every title."""
+    library._substring_candidates = lambda *needles: (
+        library._handle(i) for i in range(library._row_count())
+    )
+    return library
+
+
+def assert_same_matches(library_class):
+    conn, rows = make_library_db()
+    queries = make_queries(rows)
+    indexed = library_class(conn)
+    linear = linear_scan(library_class(conn))
+
+    def result(library, query):
+        song = library.search_track(*query)
+        return song and song['id']
+
+    mismatches = [q for q in queries if result(indexed, q) != result(linear, q)]
+    assert not mismatches, f"{len(mismatches)} of {len(queries)} differ, e.g. {mismatches[:5]}"
+    assert any(result(indexed, q) for q in queries)
+
+
+def test_trigram_candidates_match_linear_scan():
+    assert_same_matches(NavidromeLibrary)
+
+
+def test_trigram_candidates_match_linear_scan_columnar():
+    assert_same_matches(ColumnarLibrary)
+
+
+if __name__ == '__main__':
+    test_trigram_candidates_match_linear_scan()
+    test_trigram_candidates_match_linear_scan_columnar()
+    print("ok")